@@ -0,0 +1,14 @@
+"""Make `footparse` importable when the benchmarks are run from a checkout.
+
+Imported by the benchmark scripts before the package, so that they can be run
+as `python benchmarks/<script>.py` without installing it.
+"""
+
+import os.path
+import sys
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,170 @@
+"""End-to-end load benchmark of the crawling paths, against the mock site.
+
+Each scenario crawls the local mock of the websites (see `mocksite.py`)
+through a real `Transport`, and reports the number of pages fetched per
+second, the median and tail latency of the requests (including the time
+spent waiting for the rate limiter and retrying), and the failures. A scenario
+whose seed page (the season, competition or home page) can't be fetched is
+reported as aborted, and the next one is run:
+
+- "season": `soccerway.SeasonHarvester` on a season, its rounds and matches;
+- "matches": Soccerway match pages fetched concurrently;
+- "odds": `betexplorer.OddsScraper` on a competition;
+- "elo": `eloratings.WorldCollector` on the pages of all the teams.
+
+Usage: python benchmarks/bench_crawl.py [--latency 0.05] [--jitter 0.02]
+    [--error-rate 0.01] [--rate 100] [--limit 50] [--workers 8]
+"""
+
+import argparse
+import os.path
+import sys
+import threading
+import time
+
+import requests
+
+import _path  # noqa: F401
+from footparse import betexplorer, eloratings, instrument, soccerway
+from footparse._utils import bounded_map
+from footparse.ratelimit import RateLimiter
+from footparse.transport import Transport
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mocksite import MockSite  # noqa: E402
+
+
+class Recorder:
+
+    """Record the latency and status of the requests, as an instrument hook."""
+
+    def __init__(self):
+        self.latencies = list()
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, phase, page_cls, seconds, info):
+        if phase != "fetch":
+            return
+        with self._lock:
+            self.latencies.append(seconds)
+            if info["status"] != 200:
+                self.failures += 1
+
+
+def season(transport, workers):
+    harvester = soccerway.SeasonHarvester(1, workers=workers,
+                                          transport=transport)
+    for _ in harvester.harvest():
+        pass
+    return len(harvester.errors)
+
+
+def matches(transport, workers, count=200):
+    def fetch(swid):
+        try:
+            url = soccerway.MatchPage.make_url(swid)
+            with soccerway.MatchPage.from_url(url, transport=transport) as page:
+                page.info
+            return None
+        except requests.RequestException as exc:
+            return exc
+
+    return sum(res is not None
+               for res in bounded_map(fetch, range(count), workers))
+
+
+def odds(transport, workers):
+    url = betexplorer.CompetitionPage.get_url("europe", "euro")
+    page = betexplorer.CompetitionPage.from_url(url, transport=transport)
+    scraper = betexplorer.OddsScraper(page, transport=transport)
+    for _ in scraper.scrape(workers=workers, ordered=False):
+        pass
+    return len(scraper.errors)
+
+
+def elo(transport, workers):
+    collector = eloratings.WorldCollector(workers=workers, transport=transport)
+    for _ in collector.collect(ordered=False):
+        pass
+    return len(collector.errors)
+
+
+SCENARIOS = [
+    ("season", season),
+    ("matches", matches),
+    ("odds", odds),
+    ("elo", elo),
+]
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(name, scenario, site, workers, limiter):
+    """Run a scenario and print its row.
+
+    Return the number of errors, or the exception that aborted the scenario.
+    """
+    transport = Transport(pool_maxsize=workers, limiter=limiter)
+    site.install(transport)
+    recorder = Recorder()
+    instrument.register(recorder)
+    start = time.perf_counter()
+    try:
+        errors = scenario(transport, workers)
+    except requests.RequestException as exc:
+        # The seed page failed, the scenario can't go on.
+        errors = exc
+    finally:
+        elapsed = time.perf_counter() - start
+        instrument.unregister(recorder)
+        transport.close()
+    times = sorted(recorder.latencies) or [0.0]
+    print("{:<10} {:>6} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>7} {:>7}".format(
+            name, len(recorder.latencies), len(recorder.latencies) / elapsed,
+            1000 * percentile(times, 0.5), 1000 * percentile(times, 0.9),
+            1000 * percentile(times, 0.99), recorder.failures,
+            "aborted" if isinstance(errors, Exception) else errors),
+          flush=True)
+    if isinstance(errors, Exception):
+        print("  {}: {}".format(type(errors).__name__, errors), flush=True)
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="latency of the mock site, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=None,
+                        help="requests per second served by the mock site")
+    parser.add_argument("--limit", type=float, default=None,
+                        help="requests per second allowed by a RateLimiter")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--filter", help="only run matching scenarios")
+    args = parser.parse_args()
+
+    print("{:<10} {:>6} {:>9} {:>9} {:>9} {:>9} {:>7} {:>7}".format(
+            "scenario", "pages", "pages/s", "p50 ms", "p90 ms", "p99 ms",
+            "failed", "errors"))
+    with MockSite(latency=args.latency, jitter=args.jitter,
+                  error_rate=args.error_rate, rate=args.rate) as site:
+        for name, scenario in SCENARIOS:
+            if args.filter is not None and args.filter not in name:
+                continue
+            limiter = None
+            if args.limit is not None:
+                limiter = RateLimiter(rate=args.limit, burst=args.workers,
+                                      concurrency=args.workers,
+                                      max_concurrency=args.workers,
+                                      backoff=0.05)
+            run(name, scenario, site, args.workers, limiter)
+        print("\nResponses by status: {}".format(
+                dict(sorted(site.responses.items()))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare `strptime` and `parse_date` on the Eloratings Germany fixture.
+
+The dates of all the rows are parsed with the legacy cascade of `strptime`
+formats and with the memoized `parse_date`, then the whole `entries`
+extraction is timed. `parse_date` and `entries` are timed both with an empty
+cache ("cold", as for the first page of a crawl) and with the dates already
+cached ("warm").
+
+Usage: python benchmarks/bench_dates.py
+"""
+
+import os.path
+import timeit
+
+from datetime import datetime
+
+import _path  # noqa: F401
+from footparse import eloratings
+from footparse._utils import _parse_date, parse_date
+
+
+PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data",
+                    "eloratings_germany.html")
+
+
+def parse_legacy(dt_str):
+    try:
+        return datetime.strptime(dt_str, "%B %d %Y").date()
+    except ValueError:
+        try:
+            return datetime.strptime(dt_str, "%B %Y").date()
+        except ValueError:
+            return datetime.strptime(dt_str, "%Y").date()
+
+
+def parse_new(dt_str):
+    return parse_date(dt_str, "%B %d %Y", "%B %Y", "%Y")
+
+
+def main(number=20, repeat=5):
+    page = eloratings.TeamPage.from_file(PATH)
+    texts = [" ".join(eloratings.TeamPage._TEXTS(row[0]))
+             for row in eloratings.TeamPage._ROWS(page.tree)]
+    assert list(map(parse_legacy, texts)) == list(map(parse_new, texts))
+    print("{} dates".format(len(texts)))
+
+    def report(name, func, cold=False):
+        # Runs are timed one by one, so that the cache can be cleared before
+        # each of them, and the cold and warm timings are comparable.
+        if cold:
+            setup = _parse_date.cache_clear
+        else:
+            setup = "pass"
+            func()
+        times = timeit.repeat(func, setup=setup, number=1,
+                              repeat=number * repeat)
+        print("{:<18} {:>8.2f} ms".format(name, 1000 * min(times)))
+
+    def entries():
+        return eloratings.TeamPage(page.data).entries
+
+    report("strptime", lambda: list(map(parse_legacy, texts)))
+    report("parse_date (cold)", lambda: list(map(parse_new, texts)), cold=True)
+    report("parse_date (warm)", lambda: list(map(parse_new, texts)))
+    report("entries (cold)", entries, cold=True)
+    report("entries (warm)", entries)
+
+
+if __name__ == "__main__":
+    main()
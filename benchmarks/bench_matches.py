@@ -0,0 +1,47 @@
+"""Compare the lxml and regex engines for Soccerway match tables.
+
+For each round and season fixture, the page is parsed from its raw bytes and
+its matches are extracted, with each engine. Throughput is reported in rows
+per second.
+
+Usage: python benchmarks/bench_matches.py
+"""
+
+import glob
+import os.path
+import timeit
+
+import _path  # noqa: F401
+from footparse import soccerway
+
+
+DATA_ROOT = os.path.join(os.path.dirname(__file__), "..", "tests", "data")
+
+
+def extract(raw, engine):
+    page = soccerway.SeasonPage(raw)
+    page.MATCHES_ENGINE = engine
+    return page.matches
+
+
+def main(number=20, repeat=5):
+    print("{:<35} {:>6} {:>12} {:>12} {:>8}".format(
+            "fixture", "rows", "lxml rows/s", "regex rows/s", "speedup"))
+    paths = (glob.glob(os.path.join(DATA_ROOT, "soccerway_round*.html"))
+             + glob.glob(os.path.join(DATA_ROOT, "soccerway_season_*.html")))
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            raw = f.read()
+        rows = len(extract(raw, "lxml"))
+        rates = list()
+        for engine in ("lxml", "regex"):
+            times = timeit.repeat(lambda: extract(raw, engine),
+                                  number=number, repeat=repeat)
+            rates.append(rows * number / min(times))
+        print("{:<35} {:>6} {:>12.0f} {:>12.0f} {:>7.1f}x".format(
+                os.path.basename(path), rows, rates[0], rates[1],
+                rates[1] / rates[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Local mock of the scraped websites, serving the test fixtures.
+
+The server answers requests for the URLs of Soccerway, Eloratings, FIFA and
+BetExplorer with the fixtures of `tests/data`, picked from the `Host` header
+and the path. Latency, jitter, errors and rate limiting can be injected, to
+load-test crawls reproducibly and offline::
+
+    with MockSite(latency=0.05, jitter=0.02, error_rate=0.01) as site:
+        transport = Transport()
+        site.install(transport)
+        page = soccerway.MatchPage.from_url(soccerway.MatchPage.make_url(1))
+
+`install` mounts an adapter on the session of a transport, which sends the
+requests for the mocked hosts to the local server instead.
+
+Usage (standalone): python benchmarks/mocksite.py [--port 8000] [...]
+"""
+
+import argparse
+import http.server
+import os.path
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+
+from requests.adapters import HTTPAdapter
+
+
+DATA_ROOT = os.path.join(os.path.dirname(__file__), "..", "tests", "data")
+
+HOSTS = ("int.soccerway.com", "www.eloratings.net", "www.fifa.com",
+         "www.betexplorer.com")
+
+# Pairs of (host, path pattern) and fixtures, the first match wins. Lists of
+# fixtures are cycled through using the last number in the path (or a hash of
+# the path if there is none).
+ROUTES = [
+    (("int.soccerway.com", r"^/matches/"), [
+        "soccerway_match.html", "soccerway_match2.html",
+        "soccerway_match_events.html", "soccerway_match_subst.html",
+        "soccerway_match_multicoach.html"]),
+    (("int.soccerway.com", r"^/players/"), "soccerway_person.html"),
+    (("int.soccerway.com", r"^/teams/"), "soccerway_team.html"),
+    (("int.soccerway.com", r"^/a/block_competition_matches_summary"), None),
+    (("int.soccerway.com", r"/r\d+/$"), [
+        "soccerway_round3.html", "soccerway_round4.html"]),
+    (("int.soccerway.com", r"/s\d+/$"), "soccerway_season_euro16.html"),
+    (("int.soccerway.com", r"/c\d+/$"), "soccerway_season_cl.html"),
+    (("www.eloratings.net", r"^/$"), "eloratings_home.html"),
+    (("www.eloratings.net", r"\.htm$"), [
+        "eloratings_germany.html", "eloratings_antigua.html"]),
+    (("www.fifa.com", r"^/fifa-world-ranking/"), "fifa_home.html"),
+    (("www.betexplorer.com", r"matchdetails\.php$"),
+     "betexplorer_euro_2016_swi_fra.html"),
+    (("www.betexplorer.com", r"^/gres/ajax-matchodds\.php$"),
+     "betexplorer_euro_2016_swi_fra_odds_1x2.html"),
+    (("www.betexplorer.com", r"^/soccer/"), "betexplorer_euro_2016.html"),
+]
+
+
+class MockSite:
+
+    """Threaded HTTP server mocking the websites.
+
+    Responses are delayed by `latency` seconds, plus or minus up to `jitter`
+    seconds. A fraction `error_rate` of the requests fail with a 500, as do
+    all the requests whose path matches one of the regular expressions of
+    `fail_paths`. If `rate` is set, requests beyond `rate` per second (with bursts of up to
+    `burst`) are answered with a 429 and a `Retry-After` header.
+    """
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate=None, burst=10, fail_paths=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fail_paths = list(fail_paths)
+        self.rate = rate
+        self.burst = burst
+        # Counters of the responses, by status code.
+        self.responses = dict()
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._fixtures = dict()
+        self._server = http.server.ThreadingHTTPServer(
+                ("127.0.0.1", port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # `shutdown` waits for `serve_forever`, which may not have started.
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def install(self, transport):
+        """Send the requests of `transport` for the mocked hosts here.
+
+        The pool settings of the adapter that was mounted for the hosts are
+        kept.
+        """
+        for scheme in ("http://", "https://"):
+            current = transport.session.get_adapter(scheme + HOSTS[0])
+            adapter = _LocalAdapter(
+                    self.port, pool_connections=current._pool_connections,
+                    pool_maxsize=current._pool_maxsize,
+                    pool_block=current._pool_block,
+                    max_retries=current.max_retries)
+            for host in HOSTS:
+                transport.session.mount(scheme + host, adapter)
+
+    def respond(self, host, target):
+        """Return the status, headers and body of the response."""
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency
+                           + random.uniform(-self.jitter, self.jitter)))
+        if self.rate is not None and not self._take_token():
+            return 429, {"Retry-After": "1"}, b""
+        url = urllib.parse.urlsplit(target)
+        if (random.random() < self.error_rate
+                or any(re.search(p, url.path) for p in self.fail_paths)):
+            return 500, dict(), b""
+        fname = self.route(host, url.path, url.query)
+        if fname is None:
+            return 404, dict(), b""
+        content_type = ("application/json" if fname.endswith(".json")
+                        else "text/html; charset=utf-8")
+        return 200, {"Content-Type": content_type}, self._fixture(fname)
+
+    def route(self, host, path, query=""):
+        for (route_host, pattern), fnames in ROUTES:
+            if route_host != host or re.search(pattern, path) is None:
+                continue
+            if fnames is None:
+                return _block(query)
+            if isinstance(fnames, str):
+                return fnames
+            numbers = re.findall(r"\d+", path)
+            index = (int(numbers[-1]) if numbers
+                     else zlib.crc32(path.encode("utf-8")))
+            return fnames[index % len(fnames)]
+        return None
+
+    def _take_token(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _fixture(self, fname):
+        if fname not in self._fixtures:
+            with open(os.path.join(DATA_ROOT, fname), "rb") as f:
+                self._fixtures[fname] = f.read()
+        return self._fixtures[fname]
+
+    def _count(self, status):
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+
+
+def _block(query):
+    # The first page of a round has a previous page, the second one hasn't.
+    params = urllib.parse.parse_qs(query).get("params", ['{"page":0}'])[0]
+    match = re.search(r'"page":\s*(-?\d+)', params)
+    page = int(match.group(1)) if match else 0
+    return "soccerway_block1.json" if page == 0 else "soccerway_block3.json"
+
+
+def _handler(site):
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            host = self.headers.get("Host", "").split(":")[0]
+            status, headers, body = site.respond(host, self.path)
+            site._count(status)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class _LocalAdapter(HTTPAdapter):
+
+    # Rewrites requests to the local server, keeping the original host.
+
+    def __init__(self, port, **kwargs):
+        self.port = port
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = urllib.parse.urlsplit(request.url)
+        request.headers["Host"] = url.netloc
+        request.url = urllib.parse.urlunsplit(
+                ("http", "127.0.0.1:{}".format(self.port), url.path,
+                 url.query, ""))
+        return super().send(request, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=None)
+    args = parser.parse_args()
+    site = MockSite(args.port, args.latency, args.jitter, args.error_rate,
+                    args.rate)
+    print("Serving on port {}".format(site.port))
+    try:
+        site._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Benchmark suite for the page parsers.
+
+Every page class is benchmarked against its fixtures in `tests/data`, along
+with synthetically scaled variants (a 10k-row Eloratings history, a
+200-match Soccerway round, ...). For each page, the construction and parsing
+of the document and the extraction of every public property are timed
+separately. Each operation is reported with its throughput, median and 99th
+percentile latency, and the peak memory allocated by Python while it runs
+(as seen by `tracemalloc`).
+
+Results can be saved as a JSON baseline, and later runs compared against it::
+
+    python benchmarks/suite.py --save before
+    ...  # Change the parsers.
+    python benchmarks/suite.py --compare before
+
+Baselines are stored in `benchmarks/baselines/`, which isn't versioned:
+timings only compare on the machine that recorded them. The host and the
+versions of Python and lxml are saved along with the results, and a
+comparison against a baseline recorded elsewhere is refused, unless
+`--force` is given.
+"""
+
+import argparse
+import copy
+import json
+import os.path
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from lxml import etree
+
+import _path  # noqa: F401
+from footparse import betexplorer, eloratings, fifa, soccerway
+from footparse._utils import cached_property
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_ROOT = os.path.join(ROOT, "..", "tests", "data")
+BASELINES = os.path.join(ROOT, "baselines")
+
+# Pairs of page classes and fixtures.
+CASES = [
+    (soccerway.MatchPage, "soccerway_match.html"),
+    (soccerway.MatchPage, "soccerway_match_events.html"),
+    (soccerway.PersonPage, "soccerway_person.html"),
+    (soccerway.TeamPage, "soccerway_team.html"),
+    (soccerway.SeasonPage, "soccerway_season_cl.html"),
+    (soccerway.SeasonPage, "soccerway_season_superlig.html"),
+    (soccerway.RoundPage, "soccerway_round4.html"),
+    (soccerway.MatchesBlock, "soccerway_block1.json"),
+    (eloratings.HomePage, "eloratings_home.html"),
+    (eloratings.TeamPage, "eloratings_germany.html"),
+    (eloratings.TeamPage, "eloratings_antigua.html"),
+    (fifa.RankingPage, "fifa_home.html"),
+    (betexplorer.MatchPage, "betexplorer_euro_2016_swi_fra.html"),
+    (betexplorer.OddsPage, "betexplorer_euro_2016_swi_fra_odds_1x2.html"),
+    (betexplorer.CompetitionPage, "betexplorer_euro_2016.html"),
+]
+
+# Scaled variants: page class, fixture, XPath of the rows, number of rows.
+SCALED = [
+    (eloratings.TeamPage, "eloratings_germany.html",
+     '//table[@class="results"]/tr[@class="nh"]', 10000),
+    (eloratings.HomePage, "eloratings_home.html",
+     '//table[@rules="groups"][not(@class)]/tr[not(@class)]', 2000),
+    (soccerway.RoundPage, "soccerway_round4.html",
+     '//table[contains(@class, "matches")]/tbody/tr[contains(@class, "match")]',
+     200),
+    (fifa.RankingPage, "fifa_home.html",
+     '//table[contains(@class, "tbl-ranking")]/tbody/tr', 2000),
+]
+
+# Properties that aren't benchmarked, because they make requests.
+EXCLUDED = {"tree", "json", "odds_page", "odds_ids", "matches_ids"}
+
+
+def properties(page_cls):
+    """Names of the public properties of `page_cls`."""
+    names = list()
+    for name in dir(page_cls):
+        attr = getattr(page_cls, name)
+        if (isinstance(attr, (property, cached_property))
+                and not name.startswith("_") and name not in EXCLUDED):
+            names.append(name)
+    return names
+
+
+def scale(raw, xpath, rows):
+    """Repeat the rows selected by `xpath` until there are `rows` of them."""
+    tree = etree.HTML(raw)
+    elems = tree.xpath(xpath)
+    parent = elems[-1].getparent()
+    for i in range(rows - len(elems)):
+        parent.append(copy.deepcopy(elems[i % len(elems)]))
+    return etree.tostring(tree, method="html", encoding="utf-8")
+
+
+def measure(func, setup, samples):
+    """Time `samples` calls of `func(setup())`, return the statistics."""
+    times = list()
+    for _ in range(samples):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    arg = setup()
+    tracemalloc.start()
+    func(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "ops": len(times) / sum(times),
+        "p50": statistics.median(times),
+        "p99": times[min(len(times) - 1, int(0.99 * len(times)))],
+        "peak_kib": peak / 1024,
+    }
+
+
+def benchmark(page_cls, label, raw, samples, pattern=None):
+    """Yield `(name, stats)` for the operations on a page."""
+    prefix = "{}.{}:{}".format(page_cls.__module__.rpartition(".")[2],
+                               page_cls.__name__, label)
+    if pattern is None or pattern in prefix + ":load":
+        yield prefix + ":load", measure(
+                page_cls.parse, lambda: page_cls(raw), samples)
+    for name in properties(page_cls):
+        if pattern is not None and pattern not in prefix + ":" + name:
+            continue
+
+        def extract(page):
+            value = getattr(page, name)
+            if hasattr(value, "__next__"):
+                list(value)
+
+        try:
+            extract(page_cls(raw))
+        except Exception:
+            # The property doesn't apply to this fixture.
+            continue
+        yield "{}:{}".format(prefix, name), measure(
+                extract, lambda: page_cls(raw).parse(), samples)
+
+
+def pages():
+    """Yield `(page_cls, label, raw)` for the fixtures and scaled variants."""
+    for page_cls, fname in CASES:
+        with open(os.path.join(DATA_ROOT, fname), "rb") as f:
+            yield page_cls, fname, f.read()
+    for page_cls, fname, xpath, rows in SCALED:
+        with open(os.path.join(DATA_ROOT, fname), "rb") as f:
+            raw = f.read()
+        label = "{}[x{}]".format(fname, rows)
+        yield page_cls, label, scale(raw, xpath, rows)
+
+
+def run(samples, pattern=None):
+    results = dict()
+    for page_cls, label, raw in pages():
+        for name, stats in benchmark(page_cls, label, raw, samples, pattern):
+            results[name] = stats
+            report(name, stats)
+    return results
+
+
+def report(name, stats):
+    line = "{:<80} {:>10.0f}/s p50 {:>9.3f} ms p99 {:>9.3f} ms {:>9.0f} KiB".format(
+            name, stats["ops"], 1000 * stats["p50"], 1000 * stats["p99"],
+            stats["peak_kib"])
+    print(line, flush=True)
+
+
+def environment():
+    """Describe the host and the versions the timings depend on."""
+    return {
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "system": platform.platform(),
+        "python": "{} {}".format(platform.python_implementation(),
+                                 platform.python_version()),
+        "lxml": ".".join(map(str, etree.LXML_VERSION)),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the operations that got slower by more than `threshold`."""
+    regressions = 0
+    print("\n{:<80} {:>10} {:>10} {:>8}".format(
+            "operation", "base p50", "p50", "ratio"))
+    for name, stats in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = stats["p50"] / baseline[name]["p50"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        print("{:<80} {:>8.3f}ms {:>8.3f}ms {:>7.2f}x{}".format(
+                name, 1000 * baseline[name]["p50"], 1000 * stats["p50"],
+                ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--samples", type=int, default=30)
+    parser.add_argument("--filter", help="only run matching operations")
+    parser.add_argument("--save", metavar="NAME", help="save a baseline")
+    parser.add_argument("--compare", metavar="NAME",
+                        help="compare against a baseline")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported as a regression")
+    parser.add_argument("--force", action="store_true",
+                        help="compare against a baseline recorded "
+                             "in another environment")
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        path = os.path.join(BASELINES, args.compare + ".json")
+        with open(path) as f:
+            baseline = json.load(f)
+        env = environment()
+        diff = sorted(key for key in env
+                      if baseline.get("environment", {}).get(key) != env[key])
+        if diff:
+            print("Baseline {} was recorded in another environment ({})."
+                  .format(path, ", ".join(diff)), file=sys.stderr)
+            if not args.force:
+                sys.exit("Record a new baseline with --save, or use --force.")
+    results = run(args.samples, args.filter)
+    if args.save is not None:
+        os.makedirs(BASELINES, exist_ok=True)
+        path = os.path.join(BASELINES, args.save + ".json")
+        with open(path, "w") as f:
+            json.dump({
+                "environment": environment(),
+                "samples": args.samples,
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print("\nSaved {}".format(path))
+    if args.compare is not None:
+        if compare(results, baseline["results"], args.threshold) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,373 @@
-import requests
+import asyncio
+import codecs
+import collections
+import concurrent.futures
+import datetime
+import functools
+import itertools
+import re
+import threading
+import time
 
+from lxml import etree
+from . import instrument
+from .transport import USER_AGENT, get_transport
 
-USER_AGENT = ("Mozilla/5.0 (iPhone14,3; U; CPU iPhone OS 15_0 like Mac OS X) "
-    "AppleWebKit/602.1.50 (KHTML, like Gecko) "
-    "Version/10.0 Mobile/19A346 Safari/602.1")
+
+_CHARSET_RE = re.compile(rb'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_PARSERS = threading.local()
+
+_MONTHS = {name: i for i, name in enumerate((
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december"), start=1)}
+_MONTHS.update({name[:3]: i for name, i in list(_MONTHS.items())})
+# Regular expressions for the supported `strptime` directives.
+_DIRECTIVES = {
+    "d": r"(?P<d>\d{1,2})",
+    "m": r"(?P<m>\d{1,2})",
+    "Y": r"(?P<Y>\d{4})",
+    "B": r"(?P<B>[A-Za-z]+)",
+    "A": r"[A-Za-z]+",
+}
 
 
 class BasePage:
 
-    def __init__(self, data):
+    # Transport used for the requests made on behalf of the page.
+    transport = None
+    # URL the page was fetched from, if any.
+    url = None
+
+    def __init__(self, data, encoding=None):
         self.data = data
+        self.encoding = encoding
+        self._tree = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @property
+    def tree(self):
+        # The document is only parsed on first access.
+        if self._tree is None:
+            raw = self._raw()
+            if not instrument.HOOKS:
+                self._tree = parse_html(raw, self.encoding)
+            else:
+                self._tree = timed("parse", type(self), parse_html,
+                                   raw, self.encoding, bytes=len(raw))
+        return self._tree
+
+    def parse(self):
+        """Parse the document now rather than on first access."""
+        self.tree
+        return self
+
+    def release(self):
+        """Drop the raw document and the parsed tree.
+
+        Properties can no longer be read afterwards, so this should be called
+        once everything needed has been extracted from the page.
+        """
+        self.data = None
+        self._tree = None
+
+    def _raw(self):
+        if self.data is None:
+            raise ValueError("page has been released")
+        return self.data
 
     @classmethod
-    def from_file(cls, path):
-        with open(path) as f:
+    def from_file(cls, path, encoding=None):
+        with open(path, 'rb') as f:
             raw = f.read()
-        return cls(raw)
+        return cls(raw, encoding=encoding)
+
+    @classmethod
+    def from_url(cls, url, transport=None):
+        if transport is None:
+            transport = get_transport()
+        res = _fetch(transport, url, cls, page_cls=cls)
+        res.raise_for_status()
+        page = cls(res.content, encoding=declared_encoding(res))
+        page.transport = transport
+        page.url = url
+        return page
 
     @classmethod
-    def from_url(cls, url):
-        headers = {"User-Agent": USER_AGENT}
-        res = requests.get(url, headers=headers)
+    async def from_url_async(cls, url, transport=None, executor=None):
+        # Both the request and the parsing are blocking, so they run in a
+        # worker thread. lxml releases the GIL while it parses.
+        def fetch():
+            return cls.from_url(url, transport=transport).parse()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, fetch)
+
+    def _get(self, url, page_cls=None):
+        # `page_cls` is the class of the page being fetched, which picks the
+        # cache TTL, by default the class of this page.
+        if page_cls is None:
+            page_cls = type(self)
+        transport = self.transport
+        if transport is None:
+            transport = get_transport()
+        res = _fetch(transport, url, type(self), page_cls=page_cls)
         res.raise_for_status()
-        return cls(res.text)
+        return res
+
+
+def _fetch(transport, url, owner, **kwargs):
+    # `owner` is the page class on behalf of which the request is made.
+    if not instrument.HOOKS:
+        return transport.get(url, **kwargs)
+    start = time.perf_counter()
+    info = {"url": url, "status": None}
+    try:
+        res = transport.get(url, **kwargs)
+        info["status"] = res.status_code
+        if not kwargs.get("stream", False):
+            # Streamed bodies are only read by the caller.
+            info["bytes"] = len(res.content)
+        return res
+    except Exception as exc:
+        info["error"] = exc
+        raise
+    finally:
+        instrument.emit("fetch", owner, time.perf_counter() - start, **info)
+
+
+def timed(phase, page_cls, func, *args, **info):
+    """Call `func(*args)` and report its duration to the hooks."""
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        instrument.emit(phase, page_cls, time.perf_counter() - start, **info)
+
+
+def parse_html(data, encoding=None):
+    """Parse an HTML document given as bytes (or, for convenience, text).
+
+    Bytes are fed directly to the parser, without decoding them first. If
+    `encoding` is `None`, the encoding declared in the document is used,
+    falling back to UTF-8.
+    """
+    if isinstance(data, str):
+        return etree.HTML(data)
+    if encoding is None:
+        encoding = sniff_encoding(data)
+    return etree.HTML(data, _parser(encoding.lower()))
+
+
+def sniff_encoding(data):
+    """Return the encoding declared at the beginning of `data`, or UTF-8."""
+    match = _CHARSET_RE.search(data, 0, 4096)
+    return match.group(1).decode() if match is not None else "utf-8"
+
+
+def make_parser(encoding, parser_cls=etree.HTMLParser, **kwargs):
+    """Return a `parser_cls` for `encoding`, falling back to UTF-8."""
+    names = [encoding]
+    try:
+        # libxml2 doesn't know all of Python's aliases, but Python's own name
+        # for the encoding may be known to it.
+        names.append(codecs.lookup(encoding).name)
+    except LookupError:
+        pass
+    for name in names:
+        try:
+            return parser_cls(encoding=name, **kwargs)
+        except LookupError:
+            pass
+    # Unknown encoding, let's hope for the best.
+    return parser_cls(encoding="utf-8", **kwargs)
+
+
+def _parser(encoding):
+    # Parsers should not be shared across threads.
+    parsers = _PARSERS.__dict__
+    if encoding not in parsers:
+        parsers[encoding] = make_parser(encoding)
+    return parsers[encoding]
+
+
+def declared_encoding(res):
+    """Return the charset declared in the headers of `res`, if any."""
+    match = _CHARSET_RE.search(res.headers.get("Content-Type", "").encode())
+    return match.group(1).decode() if match is not None else None
+
+
+def text_of(elem):
+    """Text of `elem`, with non-breaking spaces turned into spaces."""
+    if elem.text is None:
+        return None
+    return elem.text.replace("\xa0", " ")
+
+
+def bounded_map(func, items, workers, ordered=True, window=None,
+                processes=False, return_exceptions=False):
+    """Lazily apply `func` to `items` in a pool of `workers` threads.
+
+    At most `window` (by default, `2 * workers`) items are taken from `items`
+    ahead of the results that have been consumed. If `ordered` is false,
+    results are yielded as soon as they are ready instead of in the order of
+    `items`. If `processes` is true, a pool of processes is used instead, in
+    which case `func`, the items and the results must be picklable.
+
+    If `return_exceptions` is true, `(item, result)` pairs are yielded, where
+    `result` is the exception raised by `func`, if any, instead of raising it.
+    """
+    items = iter(items)
+    if return_exceptions:
+        func = functools.partial(_item_and_result, func)
+    if window is None:
+        window = 2 * workers
+    if processes:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    pending = collections.deque()
+
+    def submit(n):
+        for item in itertools.islice(items, n):
+            pending.append(executor.submit(func, item))
+
+    try:
+        submit(window)
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = concurrent.futures.wait(
+                        pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+            yield future.result()
+            # Only refill once the consumer asks for more results.
+            submit(1)
+    finally:
+        # `cancel_futures` of `Executor.shutdown` requires Python 3.9.
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _item_and_result(func, item):
+    try:
+        return item, func(item)
+    except Exception as exc:
+        return item, exc
+
+
+class cached_property:
+
+    """Property computed once per instance, on first access.
+
+    Unlike `functools.cached_property`, the value is guaranteed to be
+    computed only once, even if several threads access it concurrently.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        cache = obj.__dict__
+        if self.name not in cache:
+            # Reentrant, as properties often depend on other properties.
+            with cache.setdefault("_property_lock", threading.RLock()):
+                if self.name not in cache:
+                    if not instrument.HOOKS:
+                        cache[self.name] = self.func(obj)
+                    else:
+                        cache[self.name] = timed(
+                                "extract", type(obj), self.func, obj,
+                                property=self.name)
+        return cache[self.name]
+
+
+def cached_sequence(func):
+    """Cached property whose generator is materialized into a tuple."""
+    @functools.wraps(func)
+    def wrapper(self):
+        return tuple(func(self))
+    return cached_property(wrapper)
+
+
+def parse_date(text, *formats):
+    """Parse a date with the first of `formats` that matches `text`.
+
+    Formats use the `strptime` directives `%d`, `%m`, `%Y`, `%B` (month name)
+    and `%A` (day name, ignored). Unlike `strptime`, month names are always
+    English, whatever the locale. Results are memoized, as the same dates
+    come up over and over again. Raises `ValueError` if no format matches.
+    """
+    # Strings returned by lxml keep a reference to their element, and thus
+    # to the whole tree, so only plain strings are used as cache keys.
+    return _parse_date(str(text), formats)
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_date(text, formats):
+    for fmt in formats:
+        match = _date_regex(fmt).fullmatch(text.strip())
+        if match is None:
+            continue
+        fields = match.groupdict()
+        if "B" in fields:
+            month = _MONTHS.get(fields["B"].lower())
+            if month is None:
+                continue
+        else:
+            month = int(fields.get("m", 1))
+        try:
+            return datetime.date(int(fields["Y"]), month,
+                                 int(fields.get("d", 1)))
+        except ValueError:
+            continue
+    raise ValueError("date {!r} does not match {}".format(text, formats))
+
+
+@functools.lru_cache(maxsize=None)
+def _date_regex(fmt):
+    parts = list()
+    for literal, directive in re.findall(r"([^%]*)(?:%(.))?", fmt):
+        for token in re.split(r"(\s+)", literal):
+            parts.append(r"\s+" if token.isspace() else re.escape(token))
+        if directive:
+            parts.append(_DIRECTIVES[directive])
+    return re.compile("".join(parts), re.I)
+
+
+def _clean_number(blob):
+    if isinstance(blob, str):
+        # Unicode minus signs and non-breaking spaces are common in tables.
+        blob = blob.replace("\u2212", "-").replace("\xa0", "").strip()
+    return blob
 
 
 def int_or_none(blob):
+    """Convert `blob` to an int, or return `None` if it isn't a number."""
     try:
-        return int(blob)
-    except ValueError:
+        return int(_clean_number(blob))
+    except (TypeError, ValueError):
         return None
 
 
 def float_or_none(blob):
+    """Convert `blob` to a float, or return `None` if it isn't a number."""
     try:
-        return float(blob)
-    except TypeError:
+        return float(_clean_number(blob))
+    except (TypeError, ValueError):
         return None
@@ -0,0 +1,40 @@
+"""Asyncio helpers to fetch many pages concurrently."""
+
+import asyncio
+import itertools
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+async def fetch_many(cls, urls, concurrency=10, transport=None):
+    """Fetch and parse `urls` as instances of `cls`.
+
+    At most `concurrency` pages are in flight at any time. Pages are yielded
+    as soon as they are parsed, i.e., not necessarily in the order of `urls`;
+    use the `url` attribute of each page to match them up. To actually keep
+    `concurrency` connections to a single host alive, the transport's
+    `pool_maxsize` should be at least as large.
+    """
+    urls = iter(urls)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = set()
+
+    def submit(n):
+        for url in itertools.islice(urls, n):
+            pending.add(asyncio.ensure_future(cls.from_url_async(
+                    url, transport=transport, executor=executor)))
+
+    try:
+        submit(concurrency)
+        while pending:
+            done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            submit(len(done))
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        # `cancel_futures` of `Executor.shutdown` requires Python 3.9.
+        executor.shutdown(wait=False)
@@ -0,0 +1,242 @@
+"""Reading and writing crawl archives.
+
+Archived pages are read straight into the page classes, without extracting
+the archives first. The class of each page is picked from its URL, using
+`ROUTES` (or custom routes)::
+
+    for url, page in archive.read_warc("crawl.warc.gz"):
+        if isinstance(page, soccerway.MatchPage):
+            ...
+
+Both WARC files (optionally gzipped, one member per record) and tar
+archives (optionally compressed) are supported. Crawls are captured into a
+WARC file by passing a `WarcWriter` to the transport::
+
+    with archive.WarcWriter("crawl.warc.gz") as writer:
+        transport = Transport(recorder=writer)
+        page = soccerway.MatchPage.from_url(url, transport=transport)
+"""
+
+import datetime
+import gzip
+import io
+import re
+import tarfile
+import threading
+import uuid
+
+import requests
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from . import betexplorer, eloratings, fifa, soccerway
+from ._utils import declared_encoding
+
+
+# Pairs of URL patterns and page classes, the first match wins.
+ROUTES = [
+    (r'soccerway\.com/matches/', soccerway.MatchPage),
+    (r'soccerway\.com/players/', soccerway.PersonPage),
+    (r'soccerway\.com/teams/', soccerway.TeamPage),
+    (r'soccerway\.com/a/block_competition_matches_summary',
+     soccerway.MatchesBlock),
+    (r'soccerway\.com/.*/r\d+/', soccerway.RoundPage),
+    (r'soccerway\.com/.*/s\d+/', soccerway.SeasonPage),
+    (r'soccerway\.com/.*/c\d+/', soccerway.CompetitionPage),
+    (r'eloratings\.net/?$', eloratings.HomePage),
+    (r'eloratings\.net/.+\.htm$', eloratings.TeamPage),
+    (r'fifa\.com/fifa-world-ranking/ranking-table/', fifa.RankingPage),
+    (r'betexplorer\.com/.*matchdetails\.php', betexplorer.MatchPage),
+    (r'betexplorer\.com/gres/ajax-matchodds\.php', betexplorer.OddsPage),
+    (r'betexplorer\.com/soccer/[^/?]+/[^/?]+/$', betexplorer.CompetitionPage),
+]
+
+_COMPILED = dict()
+
+
+def route(url, routes=None):
+    """Return the page class for `url`, or `None` if no route matches."""
+    if routes is None:
+        routes = ROUTES
+    for pattern, page_cls in routes:
+        if pattern not in _COMPILED:
+            _COMPILED[pattern] = re.compile(pattern)
+        if _COMPILED[pattern].search(url):
+            return page_cls
+    return None
+
+
+def read_warc(source, routes=None):
+    """Yield `(url, page)` pairs for the routed responses of a WARC file.
+
+    `source` is a path or a binary file object. Only successful responses
+    are considered.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            yield from read_warc(f, routes)
+        return
+    if not hasattr(source, "peek"):
+        source = io.BufferedReader(source)
+    # Gzipped WARC files are made of one gzip member per record.
+    if source.peek(2)[:2] == b"\x1f\x8b":
+        source = gzip.GzipFile(fileobj=source)
+    for headers, block in _warc_records(source):
+        if headers.get("WARC-Type") != "response":
+            continue
+        url = headers["WARC-Target-URI"]
+        page_cls = route(url, routes)
+        if page_cls is None:
+            continue
+        res = _parse_http_response(url, block)
+        if res.status_code == 200:
+            yield url, _make_page(page_cls, url, res)
+
+
+def read_tar(path, routes=None, url_for=None):
+    """Yield `(url, page)` pairs for the routed files of a tar archive.
+
+    The archive is read as a stream, so it can be compressed. `url_for` maps
+    member names to URLs; by default, names are expected to be URLs without
+    their scheme, as saved by `wget --force-directories`.
+    """
+    if url_for is None:
+        url_for = _url_for
+    with tarfile.open(path, "r|*") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            url = url_for(member.name)
+            page_cls = route(url, routes)
+            if page_cls is None:
+                continue
+            page = page_cls(tar.extractfile(member).read())
+            page.url = url
+            yield url, page
+
+
+class WarcWriter:
+
+    """Write responses to a WARC file.
+
+    If the path ends with `.gz`, each record is compressed separately. The
+    writer can be shared by several threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.compress = path.endswith(".gz")
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        self._write_record("warcinfo", None, "application/warc-fields",
+                           b"software: footparse\r\n")
+
+    def write_response(self, res):
+        """Write a `requests.Response`, with its decoded body."""
+        body = res.content
+        reason = res.reason or ""
+        lines = ["HTTP/1.1 {} {}".format(res.status_code, reason)]
+        for name, value in res.headers.items():
+            # The body is stored decoded and in one piece.
+            if name.lower() not in ("content-encoding", "transfer-encoding",
+                                    "content-length"):
+                lines.append("{}: {}".format(name, value))
+        lines.append("Content-Length: {}".format(len(body)))
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        self._write_record("response", res.url,
+                           "application/http; msgtype=response", head + body)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_record(self, kind, url, content_type, block):
+        date = datetime.datetime.now(datetime.timezone.utc)
+        lines = [
+            "WARC/1.0",
+            "WARC-Type: {}".format(kind),
+            "WARC-Record-ID: <urn:uuid:{}>".format(uuid.uuid4()),
+            "WARC-Date: {}".format(date.strftime("%Y-%m-%dT%H:%M:%SZ")),
+        ]
+        if url is not None:
+            lines.append("WARC-Target-URI: {}".format(url))
+        lines.append("Content-Type: {}".format(content_type))
+        lines.append("Content-Length: {}".format(len(block)))
+        record = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8") \
+                + block + b"\r\n\r\n"
+        if self.compress:
+            record = gzip.compress(record)
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+
+
+def _warc_records(f):
+    while True:
+        line = f.readline()
+        if not line:
+            return
+        if not line.strip():
+            # Separator between records.
+            continue
+        if not line.startswith(b"WARC/"):
+            raise ValueError("invalid WARC record: {!r}".format(line[:40]))
+        headers = CaseInsensitiveDict()
+        for line in iter(f.readline, b"\r\n"):
+            if not line:
+                raise ValueError("truncated WARC record")
+            name, _, value = line.decode("utf-8").partition(":")
+            headers[name.strip()] = value.strip()
+        yield headers, f.read(int(headers["Content-Length"]))
+
+
+def _parse_http_response(url, block):
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    res = requests.Response()
+    res.url = url
+    res.status_code = int(lines[0].split(" ", 2)[1])
+    res.headers = CaseInsensitiveDict()
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        res.headers[name.strip()] = value.strip()
+    if "chunked" in res.headers.get("Transfer-Encoding", "").lower():
+        body = _dechunk(body)
+    if res.headers.get("Content-Encoding", "").lower() == "gzip":
+        body = gzip.decompress(body)
+    res.encoding = get_encoding_from_headers(res.headers)
+    res._content = body
+    res._content_consumed = True
+    return res
+
+
+def _dechunk(body):
+    f = io.BytesIO(body)
+    chunks = list()
+    while True:
+        size = int(f.readline().split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            return b"".join(chunks)
+        chunks.append(f.read(size))
+        f.readline()
+
+
+def _make_page(page_cls, url, res):
+    page = page_cls(res.content, encoding=declared_encoding(res))
+    page.url = url
+    return page
+
+
+def _url_for(name):
+    if name.startswith("./"):
+        name = name[2:]
+    if name.endswith("/index.html"):
+        name = name[:-len("index.html")]
+    return "http://" + name
@@ -0,0 +1,62 @@
+"""Batch parsing of archived pages.
+
+Parsing is CPU-bound, so `parse_dir` spreads the files across a pool of
+processes. Parsed trees can't be sent back from the workers, only the
+extracted fields are. Files are sent to the workers in chunks, to amortize
+the cost of the communication between processes::
+
+    for path, record in batch.parse_dir(soccerway.MatchPage, "archive/",
+                                        ["info", "scores"], workers=8):
+        ...
+"""
+
+import functools
+import itertools
+import os
+
+from ._utils import bounded_map
+
+
+def parse_dir(page_cls, paths, fields, workers=None, chunksize=16,
+              ordered=True):
+    """Parse files with `page_cls` and yield `(path, record)` pairs.
+
+    `paths` is either a directory, whose files are parsed in the order of
+    their names, or an iterable of paths. `record` maps each of the `fields`
+    (properties of `page_cls`) to its value. If the page can't be parsed or
+    one of its fields can't be extracted, `record` is the exception instead.
+    `workers` defaults to the number of CPUs. If `ordered` is false, records
+    are yielded as soon as their chunk is ready.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        root = paths
+        paths = (os.path.join(root, name) for name in sorted(os.listdir(root))
+                 if os.path.isfile(os.path.join(root, name)))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    paths = iter(paths)
+    chunks = iter(lambda: list(itertools.islice(paths, chunksize)), [])
+    func = functools.partial(_parse_chunk, page_cls, tuple(fields))
+    for results in bounded_map(func, chunks, workers, ordered=ordered,
+                               processes=True):
+        yield from results
+
+
+def _parse_chunk(page_cls, fields, paths):
+    results = list()
+    for path in paths:
+        try:
+            with page_cls.from_file(path) as page:
+                record = {field: _materialize(getattr(page, field))
+                          for field in fields}
+        except Exception as exc:
+            record = exc
+        results.append((path, record))
+    return results
+
+
+def _materialize(value):
+    # Generators can't be pickled.
+    if hasattr(value, "__next__"):
+        return list(value)
+    return value
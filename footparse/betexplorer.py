@@ -1,44 +1,65 @@
+import contextlib
 import re
-import requests
-from ._utils import BasePage, float_or_none
-from lxml import etree
-from datetime import datetime
+import threading
+from ._utils import (
+    BasePage, bounded_map, cached_property, cached_sequence, declared_encoding,
+    float_or_none, parse_date, parse_html, text_of)
+from .selectors import Selector
 
 class CompetitionPage(BasePage):
 
     BASE_URL = "http://www.betexplorer.com"
     URL_TEMPLATE = BASE_URL + "/soccer/{region}/{competition}/"
+    # Number of stage pages fetched concurrently.
+    STAGE_WORKERS = 8
 
-    def __init__(self, data):
-        data = data.replace(r'&nbsp;', " ")
-        self.tree = etree.HTML(data)
-        super().__init__(data)
+    _STAGE_LINKS = Selector('//a[contains(@href, "?stage=")]/@href')
+    _LOCATION = Selector('//*[@id="location"]/li[3]/a[3]')
+    _RESULTS = Selector('//tbody[@id="leagueresults_tbody"]')
+
+    def __init__(self, data, encoding=None):
+        # Maps stage URLs to the match ids of the stage.
+        self._stages = dict()
+        super().__init__(data, encoding)
 
     @classmethod
     def get_url(cls, region, competition):
         return cls.URL_TEMPLATE.format(region=region, competition=competition)
 
+    @cached_property
+    def stage_ids(self):
+        hrefs = self._STAGE_LINKS(self.tree)
+        # The same stage is usually linked more than once.
+        return list(dict.fromkeys(
+                re.search(r'\?stage=(.+)', href).group(1) for href in hrefs))
+
     @property
     def matches_ids(self):
         stage_url_template = self.BASE_URL \
-                             + self.tree.xpath('//*[@id="location"]/li[3]/a[3]')[0].get("href") \
+                             + self._LOCATION(self.tree)[0].get("href") \
                              + "results/?stage={stage_id}"
-        # Find stage ids
-        stage_ids = re.findall(r'\?stage=(.+?)"', self.data)
+        stage_urls = [stage_url_template.format(stage_id=stage_id)
+                      for stage_id in self.stage_ids]
         # Go through all stage pages
-        for stage_id in stage_ids:
-            stage_url = stage_url_template.format(stage_id=stage_id)
+        for ids in bounded_map(self._stage_matches_ids, stage_urls,
+                               self.STAGE_WORKERS):
+            yield from ids
+
+    def _stage_matches_ids(self, stage_url):
+        if stage_url not in self._stages:
             # Request made to retrieve the HTML for a given stage
-            # TODO: should be avoided maybe ?
-            res = requests.get(stage_url)
-            tree = etree.HTML(res.text)
-            matches = tree.xpath('//tbody[@id="leagueresults_tbody"]')[0]
+            res = self._get(stage_url)
+            tree = parse_html(res.content, declared_encoding(res))
+            matches = self._RESULTS(tree)[0]
+            ids = list()
             for match in matches:
                 if match[0].tag == "td":
                     href = match[0][0].get("href")
-                    m = re.match(r'\.\./matchdetails\.php\?matchid=(?P<id>.+)',
+                    m = re.match(r'(?:\.\./)?matchdetails\.php\?matchid=(?P<id>.+)',
                                  href)
-                    yield m.group("id")
+                    ids.append(m.group("id"))
+            self._stages[stage_url] = ids
+        return self._stages[stage_url]
 
 
 class MatchPage(BasePage):
@@ -46,30 +67,30 @@ class MatchPage(BasePage):
     URL_TEMPLATE = "http://www.betexplorer.com/soccer/europe/euro/matchdetails.php?matchid={match_id}"
     _ODDS_URL_TEMPLATE = "http://www.betexplorer.com/gres/ajax-matchodds.php?t=d&e={match_id}"
 
-    def __init__(self, data):
-        data = data.replace(r'&nbsp;', " ")
-        self.tree = etree.HTML(data)
-        super().__init__(data)
+    _SCRIPT = Selector('//*[@id="content"]/script')
+    _DATE = Selector('//*[@id="md-date"]')
+    _TEAM1 = Selector('//table[@class="tscore"]/tr/th[1]/strong')
+    _TEAM2 = Selector('//table[@class="tscore"]/tr/th[2]/strong')
 
     @classmethod
     def get_url_from_id(cls, match_id):
         return cls.URL_TEMPLATE.format(match_id=match_id)
     
-    @property
+    @cached_property
     def match_id(self):
-        script_node = self.tree.xpath('//*[@id="content"]/script')[0]
+        script_node = self._SCRIPT(self.tree)[0]
         m = re.search(r"matchdetails_init\('(?P<match_id>.+?)'", script_node.text)
         return m.group("match_id")
 
 
-    @property
+    @cached_property
     def info(self):
         # Date of the match
-        date = datetime.strptime(self.tree.xpath('//*[@id="md-date"]')[0].text, "%d.%m.%Y").date()
+        date = parse_date(self._DATE(self.tree)[0].text, "%d.%m.%Y")
 
         # The teams
-        team1 = self.tree.xpath('//table[@class="tscore"]/tr/th[1]/strong')[0].text
-        team2 = self.tree.xpath('//table[@class="tscore"]/tr/th[2]/strong')[0].text
+        team1 = text_of(self._TEAM1(self.tree)[0])
+        team2 = text_of(self._TEAM2(self.tree)[0])
 
         match_info = {
             'date': date,
@@ -79,31 +100,29 @@ class MatchPage(BasePage):
 
         return match_info
 
-    @property
-    def odds_ids(self):
-        # We retrieve the part of the page that contains the odds (doesn't exist, generated by JavaScript)
-        # TODO: should be avoided maybe ?
-        odds_html = requests.get(self._ODDS_URL_TEMPLATE.format(match_id=self.match_id)).text
-        tree = etree.HTML(odds_html)
-        odds_types = tree.xpath('//ul[contains(@class, "localmenu")]')[0]
+    @cached_property
+    def odds_page(self):
+        """Odds page of the default market.
 
-        # Yield all the available odds types
-        for odds_type in odds_types:
-            onclick = odds_type[0].get("onclick")
-            if onclick is not None:  # It is None if there is no odds of the given type
-                m = re.match(r"match_change_bettype\('d', '.+?', '(?P<id>.+?)'\); return false;",
-                             onclick)
-                yield m.group("id")
+        This part of the page doesn't exist in the HTML, it is generated by
+        JavaScript. It is fetched once, on first access.
+        """
+        url = self._ODDS_URL_TEMPLATE.format(match_id=self.match_id)
+        res = self._get(url, page_cls=OddsPage)
+        return OddsPage(res.content, declared_encoding(res))
+
+    @cached_property
+    def odds_ids(self):
+        return self.odds_page.odds_ids
 
 
 class OddsPage(BasePage):
 
     URL_TEMPLATE = "http://www.betexplorer.com/gres/ajax-matchodds.php?t=d&e={match_id}&b={odds_id}"
 
-    def __init__(self, data):
-        data = data.replace(r'&nbsp;', " ")
-        self.tree = etree.HTML(data)
-        super().__init__(data)
+    _SELECTED = Selector('//ul[@class="localmenu nomb"]/li[@class="set"]/a')
+    _MENU = Selector('//ul[contains(@class, "localmenu")]')
+    _BOOKMAKERS = Selector('//div[@id="odds-content"]/table/tbody')
 
     @classmethod
     def get_url_from_ids(cls, match_id, odds_id):
@@ -118,29 +137,41 @@ class OddsPage(BasePage):
             try:
                 return float(cell.text)
             except ValueError:
-                return cell.text
+                return text_of(cell)
 
-    @property
+    @cached_property
     def odds_id(self):
-        onclick = self.tree.xpath('//ul[@class="localmenu nomb"]/li[@class="set"]/a')[0].get("onclick")
+        onclick = self._SELECTED(self.tree)[0].get("onclick")
         m = re.match(r"match_change_bettype\('d', '.+?', '(?P<id>.+?)'\); return false;",
                      onclick)
         return m.group("id")
 
-    @property
+    @cached_sequence
+    def odds_ids(self):
+        odds_types = self._MENU(self.tree)[0]
+
+        # Yield all the available odds types
+        for odds_type in odds_types:
+            onclick = odds_type[0].get("onclick")
+            if onclick is not None:  # It is None if there is no odds of the given type
+                m = re.match(r"match_change_bettype\('d', '.+?', '(?P<id>.+?)'\); return false;",
+                             onclick)
+                yield m.group("id")
+
+    @cached_property
     def type(self):
-        t = self.tree.xpath('//ul[@class="localmenu nomb"]/li[@class="set"]/a')[0].text
+        t = text_of(self._SELECTED(self.tree)[0])
         # Remove trailing space
         if t[-1] == " ":
             t = t[:-1]
         return t
 
-    @property
+    @cached_sequence
     def odds(self):
-        bookmakers = self.tree.xpath('//div[@id="odds-content"]/table/tbody')[0]
+        bookmakers = self._BOOKMAKERS(self.tree)[0]
         for bookmaker in bookmakers:
             odd = {
-                "company_name": bookmaker[0][0][0].tail,
+                "company_name": bookmaker[0][0][0].tail.replace("\xa0", " "),
                 "odds": [self._value_from_cell(cell) for cell in bookmaker[1:]],
                 "type": self.type,
                 "odds_id": self.odds_id
@@ -150,26 +181,68 @@ class OddsPage(BasePage):
 
 class OddsScraper:
 
-    def __init__(self, competition_page):
+    def __init__(self, competition_page, transport=None):
         self.competition_page = competition_page
+        self.transport = transport
+        # Maps the IDs of the matches that could not be scraped to the error.
+        self.errors = dict()
 
-    def scrape(self, types=None):
+    def scrape(self, types=None, workers=1, limits=None, ordered=True):
         """
         Scrape the odds for a given competition page.
         Optionally, specify which type of odds to scrape ('1x2', 'ha', 'ah', 'dc', 'ou', 'bts').
 
+        Matches are scraped concurrently by `workers` threads. `limits`
+        optionally maps a stage ('match' for match pages, 'odds' for odds
+        pages) to the maximum number of concurrent requests of that stage.
+        If `ordered` is true, odds are yielded in the order of the matches,
+        otherwise as soon as all the odds of a match have been fetched.
+        Matches for which a request or the parsing of a page fails are
+        skipped, and the error is recorded in `self.errors`.
+
         :return: Yield dict of odds
         """
         if types is None:
             types = ('1x2', 'ha', 'ah', 'dc', 'ou', 'bts')
-        for match_id in self.competition_page.matches_ids:
-            # Find the odds ids
-            match_url = MatchPage.get_url_from_id(match_id)
-            mp = MatchPage.from_url(match_url)
-            for odds_id in mp.odds_ids:
-                # Yield the odds
+        if limits is None:
+            limits = dict()
+        stages = {stage: threading.BoundedSemaphore(n)
+                  for stage, n in limits.items()}
+        self.errors = dict()
+
+        def scrape_match(match_id):
+            return self._scrape_match(match_id, types, stages)
+
+        for match_id, res in bounded_map(scrape_match,
+                                         self.competition_page.matches_ids,
+                                         workers, ordered=ordered,
+                                         return_exceptions=True):
+            if isinstance(res, Exception):
+                self.errors[match_id] = res
+            else:
+                yield from res
+
+    def _scrape_match(self, match_id, types, stages):
+        def stage(name):
+            return stages.get(name, contextlib.nullcontext())
+
+        # Find the odds ids
+        match_url = MatchPage.get_url_from_id(match_id)
+        with stage('match'):
+            mp = MatchPage.from_url(match_url, transport=self.transport)
+            default_page = mp.odds_page
+        odds = list()
+        for odds_id in default_page.odds_ids:
+            if odds_id not in types:
+                continue
+            if odds_id == default_page.odds_id:
+                # Reuse the odds that came with the match page.
+                odds_page = default_page
+            else:
                 odds_url = OddsPage.get_url_from_ids(match_id, odds_id)
-                odds_page = OddsPage.from_url(odds_url)
-                for odd in odds_page.odds():
-                    if odd["id"] in types:
-                        yield odd
+                with stage('odds'):
+                    odds_page = OddsPage.from_url(odds_url,
+                                                  transport=self.transport)
+            for odd in odds_page.odds:
+                odds.append(dict(odd, match_id=match_id))
+        return odds
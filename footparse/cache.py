@@ -0,0 +1,173 @@
+"""Persistent HTTP response cache.
+
+Responses are stored in a SQLite file along with their `ETag` and
+`Last-Modified` validators. A cached response is served directly while it is
+fresh; once it gets stale, it is revalidated with a conditional request, and
+the cached body is reused if the server answers `304 Not Modified`. How long a
+response stays fresh depends on the page class it is fetched for. The least
+recently used responses are evicted when the cache grows past its size cap.
+
+Typical usage::
+
+    cache = ResponseCache("footparse.db", ttls={
+        soccerway.MatchPage: None,  # Never stale, only revalidated manually.
+        soccerway.PersonPage: 30 * 86400,
+    })
+    set_transport(Transport(cache=cache))
+"""
+
+import collections
+import json
+import sqlite3
+import threading
+import time
+
+import requests
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class ResponseCache:
+
+    """Cache of successful GET responses, keyed by URL.
+
+    `ttls` maps page classes to the number of seconds their responses stay
+    fresh (`None` means forever); subclasses inherit the TTL of their parents.
+    Responses fetched for other classes use `default_ttl`. `max_size` caps the
+    total size of the cached bodies, in bytes.
+    """
+
+    def __init__(self, path, max_size=2**30, ttls=None, default_ttl=0):
+        self.max_size = max_size
+        self.ttls = dict() if ttls is None else dict(ttls)
+        self.default_ttl = default_ttl
+        # Counters: hits, misses, revalidated, bytes_saved, bytes_fetched.
+        self.stats = collections.Counter()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, headers TEXT, body BLOB, "
+                "etag TEXT, last_modified TEXT, "
+                "stored REAL, accessed REAL, size INTEGER)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS accessed_idx "
+                         "ON responses (accessed)")
+        self._db.commit()
+        # Running total of the sizes, as summing them reads every body.
+        self._size = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl_for(self, page_cls):
+        if page_cls is not None:
+            for cls in page_cls.__mro__:
+                if cls in self.ttls:
+                    return self.ttls[cls]
+        return self.default_ttl
+
+    def get(self, url, fetch, page_cls=None):
+        """Return the response for `url`, using the cache when possible.
+
+        `fetch` is called with a dict of extra request headers whenever the
+        network has to be hit, and must return a `requests.Response`.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                    "SELECT headers, body, etag, last_modified, stored "
+                    "FROM responses WHERE url = ?", (url,)).fetchone()
+        headers = dict()
+        if row is not None:
+            ttl = self.ttl_for(page_cls)
+            if ttl is None or now - row[4] < ttl:
+                self._touch(url, now, refresh=False)
+                self._count(hits=1, bytes_saved=len(row[1]))
+                return _make_response(url, row[0], row[1])
+            if row[2] is not None:
+                headers["If-None-Match"] = row[2]
+            if row[3] is not None:
+                headers["If-Modified-Since"] = row[3]
+        res = fetch(headers)
+        if res.status_code == 304 and row is not None:
+            self._touch(url, now, refresh=True)
+            self._count(revalidated=1, bytes_saved=len(row[1]))
+            return _make_response(url, row[0], row[1])
+        self._count(misses=1, bytes_fetched=len(res.content))
+        if res.status_code == 200:
+            self._store(url, res, now)
+        return res
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._size = 0
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._size
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                    "SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _count(self, **kwargs):
+        with self._lock:
+            self.stats.update(kwargs)
+
+    def _touch(self, url, now, refresh):
+        with self._lock:
+            if refresh:
+                self._db.execute("UPDATE responses SET accessed = ?, "
+                                 "stored = ? WHERE url = ?", (now, now, url))
+            else:
+                self._db.execute("UPDATE responses SET accessed = ? "
+                                 "WHERE url = ?", (now, url))
+            self._db.commit()
+
+    def _store(self, url, res, now):
+        body = res.content
+        headers = json.dumps(dict(res.headers))
+        with self._lock:
+            row = self._db.execute("SELECT size FROM responses WHERE url = ?",
+                                   (url,)).fetchone()
+            if row is not None:
+                self._size -= row[0]
+            self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES "
+                    "(?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, headers, body, res.headers.get("ETag"),
+                     res.headers.get("Last-Modified"), now, now, len(body)))
+            self._size += len(body)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        if self._size <= self.max_size:
+            return
+        rows = self._db.execute(
+                "SELECT url, size FROM responses ORDER BY accessed")
+        victims = list()
+        for url, size in rows:
+            if self._size <= self.max_size:
+                break
+            victims.append((url,))
+            self._size -= size
+        self._db.executemany("DELETE FROM responses WHERE url = ?", victims)
+
+
+def _make_response(url, headers, body):
+    res = requests.Response()
+    res.url = url
+    res.status_code = 200
+    res.headers = CaseInsensitiveDict(json.loads(headers))
+    res.encoding = get_encoding_from_headers(res.headers)
+    res._content = body
+    res.from_cache = True
+    return res
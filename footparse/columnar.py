@@ -0,0 +1,127 @@
+"""Columnar output for rating and match tables.
+
+The functions of this module extract the tables of a page directly into a
+NumPy masked structured array, with one typed column per field, nested team
+data flattened into `team1_*` and `team2_*` columns, and missing values
+masked. No dict is allocated per row. `to_arrow` converts these arrays into
+Arrow record batches.
+
+NumPy (and PyArrow for `to_arrow`) is an optional dependency::
+
+    pip install footparse[arrow]
+"""
+
+from ._utils import parse_html
+from .eloratings import HomePage, TeamPage
+from .fifa import RankingPage
+from .soccerway import MatchesBlock
+
+
+_TEAM_FIELDS = ('goals', 'rating_diff', 'rating', 'rank_diff', 'rank')
+
+ELO_RATINGS_FIELDS = [(key, 'O' if key == 'team' else 'i4')
+                      for key in HomePage.RATINGS_KEYS] + [('href', 'O')]
+ELO_ENTRIES_FIELDS = [('date', 'datetime64[D]'), ('competition', 'O')] + [
+    ('{}_{}'.format(team, field), 'O' if field == 'name' else 'i4')
+    for team in ('team1', 'team2') for field in ('name',) + _TEAM_FIELDS
+]
+FIFA_RATINGS_FIELDS = [
+    ('rank', 'i4'), ('team_name', 'O'), ('country_code', 'O'),
+    ('points', 'i4'), ('team_url', 'O'),
+]
+MATCHES_FIELDS = [
+    ('timestamp', 'i8'), ('swid', 'i8'),
+    ('team1_name', 'O'), ('team1_swid', 'i8'),
+    ('team2_name', 'O'), ('team2_swid', 'i8'),
+    ('team1_goals', 'i4'), ('team2_goals', 'i4'),
+]
+
+
+def elo_ratings(page):
+    """Ratings of an `eloratings.HomePage`."""
+    def rows():
+        for row in HomePage._ROWS(page.tree):
+            # Missing cells are `None`, and masked.
+            yield HomePage._parse_row(row)[0]
+
+    return _table(ELO_RATINGS_FIELDS, rows())
+
+
+def elo_entries(page):
+    """Match history of an `eloratings.TeamPage`."""
+    def rows():
+        for row in TeamPage._ROWS(page.tree):
+            dt, competition, *pairs = TeamPage._parse_row(row)
+            # Team 1, then team 2.
+            yield [dt, competition] + [pair[i] for i in (0, 1)
+                                        for pair in pairs]
+
+    return _table(ELO_ENTRIES_FIELDS, rows())
+
+
+def fifa_ratings(page):
+    """Ratings of a `fifa.RankingPage`."""
+    return _table(FIFA_RATINGS_FIELDS,
+                  map(RankingPage._parse_row, RankingPage._ROWS(page.tree)))
+
+
+def matches(page):
+    """Matches of a `soccerway.MatchesBlock` or `soccerway.MatchListPage`."""
+    if isinstance(page, MatchesBlock):
+        table = parse_html(page.json["commands"][0]["parameters"]["content"])
+    else:
+        table = page._MATCHES(page.tree)[0]
+    return match_table(table)
+
+
+def match_table(table):
+    """Matches of a table, see `soccerway.MatchesBlock.parse_matches`."""
+    return _table(MATCHES_FIELDS, MatchesBlock.parse_rows(table))
+
+
+def to_arrow(array):
+    """Convert a masked structured array into an Arrow record batch."""
+    np = _numpy()
+    pa = _pyarrow()
+    columns = list()
+    for name in array.dtype.names:
+        mask = np.ma.getmaskarray(array[name])
+        columns.append(pa.array(np.ma.getdata(array[name]),
+                                mask=mask if mask.any() else None))
+    return pa.RecordBatch.from_arrays(columns, names=list(array.dtype.names))
+
+
+def _table(fields, rows):
+    np = _numpy()
+    columns = [list() for _ in fields]
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+    size = len(columns[0])
+    data = np.zeros(size, dtype=fields)
+    mask = np.zeros(size, dtype=[(name, bool) for name, _ in fields])
+    for (name, kind), column in zip(fields, columns):
+        missing = np.fromiter((value is None for value in column), bool, size)
+        if missing.any() and np.dtype(kind).kind in 'iu':
+            column = [0 if value is None else value for value in column]
+        data[name] = column
+        mask[name] = missing
+    return np.ma.array(data, mask=mask)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("columnar output requires NumPy, "
+                          "install footparse[numpy]") from None
+    return numpy
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Arrow output requires PyArrow, "
+                          "install footparse[arrow]") from None
+    return pyarrow
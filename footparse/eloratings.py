@@ -1,70 +1,129 @@
+import collections
+import contextlib
+import itertools
 import re
 
-from datetime import datetime
 from lxml import etree
-from ._utils import BasePage, int_or_none
+from ._utils import (
+    BasePage, _fetch, bounded_map, cached_property, cached_sequence,
+    declared_encoding, int_or_none, make_parser, parse_date, sniff_encoding,
+    text_of)
+from .records import EloEntry
+from .selectors import Selector
+from .transport import get_transport
 
 
 class TeamPage(BasePage):
 
     URL_TEMPLATE = "http://www.eloratings.net/{path}"
+    # If true, entries are `records.EloEntry` instead of dicts.
+    RECORDS = False
 
-    def __init__(self, data):
-        # Getting rid of annoying non-breaking spaces.
-        data = data.replace('&nbsp;', " ")
-        self.tree = etree.HTML(data)
-        super().__init__(data)
+    _TITLE = Selector('//h1')
+    _ROWS = Selector('//table[@class="results"]/tr[@class="nh"]')
+    _TEXTS = Selector('./text()')
 
-    @property
+    @cached_property
     def country(self):
-        elem = self.tree.xpath('//h1')[0]
+        elem = self._TITLE(self.tree)[0]
         match = re.match(r'World Football Elo Ratings: (?P<country>.+)',
-                         elem.text)
+                         text_of(elem))
         return match.group('country')
 
-    @property
+    @cached_sequence
     def entries(self):
-        get_texts = etree.XPath('./text()')
-        for row in self.tree.xpath('//table[@class="results"]'
-                                   '/tr[@class="nh"]'):
-            dt_str = " ".join(get_texts(row[0]))
-            try:
-                dt = datetime.strptime(dt_str, "%B %d %Y").date()
-            except:
-                try:
-                    dt = datetime.strptime(dt_str, "%B %Y").date()
-                except:
-                    dt = datetime.strptime(dt_str, "%Y").date()
-            names = list(map(str, get_texts(row[1])))
-            score = list(map(int, get_texts(row[2])))
-            competition = " ".join(get_texts(row[3]))
-            rating_diffs = list(map(int_or_none, get_texts(row[4])))
-            ratings = list(map(int_or_none, get_texts(row[5])))
-            rank_diffs = list(map(int_or_none, get_texts(row[6])))
-            ranks = list(map(int_or_none, get_texts(row[7])))
-            match_info = {
-                'date': dt,
-                'competition': competition,
+        for row in self._ROWS(self.tree):
+            yield TeamPage._parse_entry(row, self.RECORDS)
+
+    @staticmethod
+    def _parse_entry(row, records=False):
+        if records:
+            return EloEntry.from_row(*TeamPage._parse_row(row))
+        (dt, competition, names, score, rating_diffs, ratings, rank_diffs,
+         ranks) = TeamPage._parse_row(row)
+        match_info = {
+            'date': dt,
+            'competition': competition,
+        }
+        for i, key in enumerate(('team1', 'team2')):
+            match_info[key] = {
+                'name': names[i],
+                'goals': score[i],
+                'rating_diff': rating_diffs[i],
+                'rating': ratings[i],
+                'rank_diff': rank_diffs[i],
+                'rank': ranks[i]
             }
-            for i, key in enumerate(('team1', 'team2')):
-                match_info[key] = {
-                    'name': names[i],
-                    'goals': score[i],
-                    'rating_diff': rating_diffs[i],
-                    'rating': ratings[i],
-                    'rank_diff': rank_diffs[i],
-                    'rank': ranks[i]
-                }
-            yield match_info
+        return match_info
+
+    @staticmethod
+    def _parse_row(row):
+        # Date, competition, and pairs of values for the two teams.
+        def get_texts(elem):
+            return [text.replace("\xa0", " ") for text in TeamPage._TEXTS(elem)]
+
+        dt = parse_date(" ".join(get_texts(row[0])), "%B %d %Y", "%B %Y", "%Y")
+        names = list(map(str, get_texts(row[1])))
+        score = list(map(int, get_texts(row[2])))
+        competition = " ".join(get_texts(row[3]))
+        rating_diffs = list(map(int_or_none, get_texts(row[4])))
+        ratings = list(map(int_or_none, get_texts(row[5])))
+        rank_diffs = list(map(int_or_none, get_texts(row[6])))
+        ranks = list(map(int_or_none, get_texts(row[7])))
+        return (dt, competition, names, score, rating_diffs, ratings,
+                rank_diffs, ranks)
+
+    @classmethod
+    def parse_entries(cls, chunks, encoding=None):
+        """Incrementally parse the entries of a document given in chunks.
+
+        `chunks` is an iterable of bytes. Each entry is yielded as soon as its
+        row has been parsed, and finished rows are discarded, so that memory
+        usage does not grow with the length of the document.
+        """
+        parser = None
+        for chunk in itertools.chain(chunks, (None,)):
+            if parser is None:
+                if chunk is None:
+                    return
+                if encoding is None:
+                    encoding = sniff_encoding(chunk)
+                parser = make_parser(encoding, etree.HTMLPullParser,
+                                     events=("end",), tag="tr")
+            if chunk is None:
+                parser.close()
+            else:
+                parser.feed(chunk)
+            for _, row in parser.read_events():
+                table = row.getparent()
+                if (row.get("class") == "nh" and table is not None
+                        and table.tag == "table"
+                        and table.get("class") == "results"):
+                    yield TeamPage._parse_entry(row, cls.RECORDS)
+                    # Discard the row and the rows before it.
+                    row.clear()
+                    while row.getprevious() is not None:
+                        del table[0]
+
+    @classmethod
+    def stream_entries(cls, url, transport=None, chunk_size=16384):
+        """Fetch a team page and yield its entries while it downloads."""
+        if transport is None:
+            transport = get_transport()
+        res = _fetch(transport, url, cls, page_cls=cls, stream=True)
+        with contextlib.closing(res):
+            res.raise_for_status()
+            yield from cls.parse_entries(res.iter_content(chunk_size),
+                                         encoding=declared_encoding(res))
 
     @classmethod
-    def from_name(cls, name):
+    def from_name(cls, name, transport=None):
         path = "{}.htm".format(name)
-        return cls.from_url(TeamPage.absolute_url(path))
+        return cls.from_url(TeamPage.absolute_url(path), transport=transport)
 
     @staticmethod
     def absolute_url(path):
-        return URL_TEMPLATE.format(path=path)
+        return TeamPage.URL_TEMPLATE.format(path=path)
 
 
 class HomePage(BasePage):
@@ -77,33 +136,106 @@ class HomePage(BasePage):
                     'matches_wins', 'matches_losses', 'matches_draws',
                     'goals_for', 'goals_against']
 
-    def __init__(self, data):
-        data = data.replace('&nbsp;', " ")
-        self.tree = etree.HTML(data)
-        super().__init__(data)
+    _DATE = Selector('//td[@class="mh"][@colspan="16"]')
+    _ROWS = Selector('//table[@rules="groups"][not(@class)]/tr[not(@class)]')
 
-    @property
+    @cached_property
     def date(self):
-        elem = self.tree.xpath('//td[@class="mh"][@colspan="16"]')[0]
+        elem = self._DATE(self.tree)[0]
         match = re.match(r'Ratings and Statistics as of (?P<date>.+)',
-                         elem.text)
-        dt = datetime.strptime(match.group('date'), "%A %B %d %Y")
-        return dt.date()
+                         text_of(elem))
+        return parse_date(match.group('date'), "%A %B %d %Y")
 
-    @property
+    @cached_sequence
     def ratings(self):
-        for row in self.tree.xpath('//table[@rules="groups"][not(@class)]'
-                                   '/tr[not(@class)]'):
+        for row in self._ROWS(self.tree):
+            values, size = HomePage._parse_row(row)
+            # Only the keys of the cells present in the row are set.
             country_info = dict()
-            for key, cell in zip(HomePage.RATINGS_KEYS, row.iter('td')):
+            for key, val in zip(HomePage.RATINGS_KEYS[:size], values):
                 if key == 'team':
-                    val = cell[0].text
-                    country_info['href'] = cell[0].get('href')
-                else:
-                    val = int_or_none(cell.text)
+                    country_info['href'] = values[-1]
                 country_info[key] = val
             yield country_info
 
+    @staticmethod
+    def _parse_row(row):
+        # Values in the order of `RATINGS_KEYS`, followed by the href of the
+        # team, and the number of cells parsed, as the row can be
+        # incomplete. Missing values are `None`.
+        values = [None] * (len(HomePage.RATINGS_KEYS) + 1)
+        size = 0
+        for key, cell in zip(HomePage.RATINGS_KEYS, row.iter('td')):
+            if key == 'team':
+                values[size] = text_of(cell[0])
+                values[-1] = cell[0].get('href')
+            else:
+                values[size] = int_or_none(cell.text)
+            size += 1
+        return values, size
+
     @classmethod
-    def load(cls):
-        return cls.from_url(HomePage.URL)
+    def load(cls, transport=None):
+        return cls.from_url(HomePage.URL, transport=transport)
+
+
+class WorldCollector:
+
+    """Fetch the pages of all the teams, and yield their matches once each.
+
+    Every match appears on the pages of both teams, possibly with the teams
+    swapped. Matches are identified by `match_key`, and each one is yielded
+    only the first time it is seen. Entries are dicts, or `records.EloEntry`
+    if `TeamPage.RECORDS` is true.
+    """
+
+    def __init__(self, workers=8, transport=None):
+        self.workers = workers
+        self.transport = transport
+        # Maps the hrefs of the team pages that could not be fetched or
+        # parsed to the error.
+        self.errors = dict()
+
+    def collect(self, hrefs=None, ordered=True):
+        """Yield the deduplicated entries of the team pages.
+
+        `hrefs` are the paths of the team pages, by default those listed on
+        the home page. If `ordered` is true, the entries are yielded in the
+        order of the pages, otherwise as soon as a page has been fetched.
+        """
+        if hrefs is None:
+            home = HomePage.load(transport=self.transport)
+            hrefs = [team['href'] for team in home.ratings]
+        self.errors = dict()
+        # Number of times each key has been yielded. Keys can repeat within
+        # a page (e.g., matches dated by year only), so a match is yielded as
+        # many times as it appears on a single page.
+        seen = collections.Counter()
+        for href, entries in bounded_map(self._fetch, dict.fromkeys(hrefs),
+                                         self.workers, ordered=ordered,
+                                         return_exceptions=True):
+            if isinstance(entries, Exception):
+                self.errors[href] = entries
+                continue
+            counts = collections.Counter()
+            for entry in entries:
+                key = match_key(entry)
+                counts[key] += 1
+                if counts[key] > seen[key]:
+                    seen[key] += 1
+                    yield entry
+
+    def _fetch(self, href):
+        url = TeamPage.absolute_url(href)
+        with TeamPage.from_url(url, transport=self.transport) as page:
+            return list(page.entries)
+
+
+def match_key(entry):
+    """Return the date, the (unordered) teams and the score of an entry."""
+    if isinstance(entry, dict):
+        sides = ((team['name'], team['goals'])
+                 for team in (entry['team1'], entry['team2']))
+        return entry['date'], tuple(sorted(sides))
+    sides = ((team.name, team.goals) for team in (entry.team1, entry.team2))
+    return entry.date, tuple(sorted(sides))
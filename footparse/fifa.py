@@ -1,31 +1,39 @@
-from ._utils import BasePage
-from lxml import etree
-from datetime import datetime
+from ._utils import (
+    BasePage, cached_property, cached_sequence, parse_date, text_of)
+from .selectors import Selector
 
 class RankingPage(BasePage):
 
     URL = "http://www.fifa.com/fifa-world-ranking/ranking-table/men/"
 
-    def __init__(self, data):
-        data = data.replace(r'&nbsp;', " ")
-        self.tree = etree.HTML(data)
-        super().__init__(data)
+    _DATE = Selector('//*[@id="content-wrap"]/div/div[2]/div/div[2]/div/div[1]/div[2]/ul/li')
+    _ROWS = Selector('//table[contains(@class, "tbl-ranking")]/tbody/tr')
 
-    @property
+    @cached_property
     def date(self):
-        ranking_date = self.tree.xpath('//*[@id="content-wrap"]/div/div[2]/div/div[2]/div/div[1]/div[2]/ul/li')[0].text
-        return datetime.strptime(ranking_date, "%d %B %Y").date()
+        ranking_date = text_of(self._DATE(self.tree)[0])
+        return parse_date(ranking_date, "%d %B %Y")
 
-    @property
+    @cached_sequence
     def ratings(self):
-        teams = self.tree.xpath('//table[contains(@class, "tbl-ranking")]/tbody/tr')
+        teams = self._ROWS(self.tree)
 
         for row in teams:
+            rank, team_name, country_code, points, team_url = \
+                    RankingPage._parse_row(row)
             team = {
-                "rank": int(row[1][0].text),
-                "team_name": row[2][1].text,
-                "country_code": row[4][0].text.lower(),
-                "points": int(row[5].text),
-                "team_url": "http://www.fifa.com" + row[2][1].get("href")
+                "rank": rank,
+                "team_name": team_name,
+                "country_code": country_code,
+                "points": points,
+                "team_url": team_url
             }
             yield team
+
+    @staticmethod
+    def _parse_row(row):
+        return (int(row[1][0].text),
+                text_of(row[2][1]),
+                row[4][0].text.lower(),
+                int(row[5].text),
+                "http://www.fifa.com" + row[2][1].get("href"))
@@ -0,0 +1,146 @@
+"""Instrumentation of the fetching and parsing of pages.
+
+Callbacks registered with `register` are called for every phase of the life
+of a page, with the phase, the page class, the duration in seconds, and a
+dict of extra information:
+
+- "fetch": a request made for the page, with its `url`, `status` and number
+  of `bytes` (not for streamed responses). If the request fails, `status` is
+  `None`, and the exception is given as `error`;
+- "decode": the decoding of a document into text or JSON, with its `bytes`;
+- "parse": the parsing of a document into a tree, with its `bytes`;
+- "extract": the computation of a cached property, with its name as
+  `property`. Durations are inclusive: they include the properties (and the
+  parsing) the property depends on.
+
+When no callback is registered, the instrumented code paths only check an
+empty list. `Metrics` aggregates the events in memory and dumps them in the
+Prometheus text format::
+
+    metrics = instrument.Metrics()
+    instrument.register(metrics)
+    ...  # Fetch and parse some pages.
+    print(metrics.prometheus())
+"""
+
+import bisect
+import collections
+import threading
+
+
+# Registered callbacks. Checked before instrumenting anything.
+HOOKS = list()
+
+# Upper bounds of the latency histogram buckets, in seconds.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+def register(callback):
+    """Call `callback(phase, page_cls, seconds, info)` for every event."""
+    HOOKS.append(callback)
+
+
+def unregister(callback):
+    HOOKS.remove(callback)
+
+
+def emit(phase, page_cls, seconds, **info):
+    for callback in list(HOOKS):
+        callback(phase, page_cls, seconds, info)
+
+
+def page_name(page_cls):
+    return "{}.{}".format(page_cls.__module__.rpartition(".")[2],
+                          page_cls.__qualname__)
+
+
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+
+    """In-memory aggregator of events, to be registered as a callback."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Map label tuples to histograms and counters.
+        self.phases = collections.defaultdict(Histogram)
+        self.properties = collections.defaultdict(Histogram)
+        self.bytes = collections.Counter()
+        self.responses = collections.Counter()
+
+    def __call__(self, phase, page_cls, seconds, info):
+        name = page_name(page_cls)
+        with self._lock:
+            self.phases[(phase, name)].observe(seconds)
+            if phase == "extract":
+                self.properties[(name, info["property"])].observe(seconds)
+            if "bytes" in info:
+                self.bytes[(phase, name)] += info["bytes"]
+            if "status" in info:
+                status = info["status"]
+                self.responses[(name, "error" if status is None
+                                else str(status))] += 1
+
+    def prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = list()
+        with self._lock:
+            _histogram(lines, "footparse_phase_seconds",
+                       "Time spent in each phase, per page class.",
+                       ("phase", "page"), self.phases)
+            _histogram(lines, "footparse_extract_seconds",
+                       "Time spent computing each property.",
+                       ("page", "property"), self.properties)
+            _counter(lines, "footparse_bytes_total",
+                     "Bytes processed in each phase, per page class.",
+                     ("phase", "page"), self.bytes)
+            _counter(lines, "footparse_responses_total",
+                     "Responses received, per page class and status code.",
+                     ("page", "status"), self.responses)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    return "{" + ",".join('{}="{}"'.format(name, _escape(value))
+                          for name, value in pairs) + "}"
+
+
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n"))
+
+
+def _histogram(lines, metric, doc, names, histograms):
+    lines.append("# HELP {} {}".format(metric, doc))
+    lines.append("# TYPE {} histogram".format(metric))
+    for key, hist in sorted(histograms.items()):
+        total = 0
+        for bound, count in zip(BUCKETS, hist.counts):
+            total += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append("{}_bucket{} {}".format(
+                    metric, _labels(names, key, le=le), total))
+        lines.append("{}_sum{} {!r}".format(metric, _labels(names, key),
+                                            hist.sum))
+        lines.append("{}_count{} {}".format(metric, _labels(names, key),
+                                            hist.count))
+
+
+def _counter(lines, metric, doc, names, counter):
+    lines.append("# HELP {} {}".format(metric, doc))
+    lines.append("# TYPE {} counter".format(metric))
+    for key, value in sorted(counter.items()):
+        lines.append("{}{} {}".format(metric, _labels(names, key), value))
@@ -0,0 +1,217 @@
+"""Incremental recrawl planning.
+
+The planner keeps track of the matches that have been crawled in a SQLite
+file: their kick-off timestamp, when they were last fetched, and whether
+their score was final. From that, it decides which match pages need to be
+fetched again:
+
+- matches that have never been fetched are always due;
+- matches with a final score are never due;
+- upcoming matches are due every `upcoming_interval` seconds;
+- live matches (that kicked off less than `live_window` seconds ago) are due
+  every `live_interval` seconds;
+- past matches without a final score (postponed, awaiting the result, ...)
+  are due every `upcoming_interval` seconds, until `give_up_after` seconds
+  after their kick-off;
+- matches whose page could not be fetched are due again after
+  `retry_interval` seconds, doubled after each consecutive failure (up to
+  `give_up_after`), whatever their kick-off.
+
+A run is bracketed by `begin_run` and `end_run`. Matches recorded during a
+run are no longer due in that run, so that a run interrupted before
+`end_run` resumes where it stopped when it is started again.
+
+Typical usage::
+
+    planner = RecrawlPlanner("planner.db")
+    harvester = soccerway.SeasonHarvester(17689, planner=planner)
+    for record in harvester.harvest():
+        ...
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+
+class RecrawlPlanner:
+
+    def __init__(self, path, live_interval=15 * 60,
+                 upcoming_interval=24 * 3600, live_window=6 * 3600,
+                 give_up_after=30 * 24 * 3600, retry_interval=15 * 60):
+        self.live_interval = live_interval
+        self.upcoming_interval = upcoming_interval
+        self.live_window = live_window
+        self.give_up_after = give_up_after
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+                "CREATE TABLE IF NOT EXISTS matches ("
+                "swid INTEGER PRIMARY KEY, timestamp INTEGER, "
+                "final INTEGER NOT NULL DEFAULT 0, fetched REAL, "
+                "failures INTEGER NOT NULL DEFAULT 0, retry_at REAL)")
+        self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta ("
+                "key TEXT PRIMARY KEY, value)")
+        self._db.commit()
+
+    @staticmethod
+    def is_final(scores):
+        """Whether `scores` (see `MatchPage.scores`) contains a final score."""
+        return scores is not None and "score_ft_team1" in scores
+
+    def observe(self, matches):
+        """Record matches found in a listing, return the swids of new ones.
+
+        `matches` are dicts with a `swid` and a `timestamp`, such as the ones
+        returned by `MatchesBlock.parse_matches`.
+        """
+        new = list()
+        with self._lock:
+            for match in matches:
+                cur = self._db.execute(
+                        "INSERT OR IGNORE INTO matches (swid, timestamp) "
+                        "VALUES (?, ?)", (match['swid'], match['timestamp']))
+                if cur.rowcount > 0:
+                    new.append(match['swid'])
+                else:
+                    # The match may have been rescheduled.
+                    self._db.execute(
+                            "UPDATE matches SET timestamp = ? "
+                            "WHERE swid = ? AND final = 0",
+                            (match['timestamp'], match['swid']))
+            self._db.commit()
+        return new
+
+    def record(self, swid, info=None, scores=None, now=None):
+        """Record that the page of match `swid` has been fetched.
+
+        `info` and `scores` are the corresponding properties of the
+        `MatchPage`.
+        """
+        if now is None:
+            now = time.time()
+        timestamp = None if info is None else info.get('timestamp')
+        with self._lock:
+            self._db.execute(
+                    "INSERT INTO matches (swid, timestamp, final, fetched) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT (swid) DO UPDATE SET "
+                    "timestamp = COALESCE(excluded.timestamp, timestamp), "
+                    "final = excluded.final, fetched = excluded.fetched, "
+                    "failures = 0, retry_at = NULL",
+                    (swid, timestamp, int(self.is_final(scores)), now))
+            self._db.commit()
+
+    def record_failure(self, swid, now=None):
+        """Record that the page of match `swid` could not be fetched.
+
+        The match keeps its schedule, but it isn't due again before a delay
+        that grows with the number of consecutive failures.
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO matches (swid) "
+                             "VALUES (?)", (swid,))
+            self._db.execute("UPDATE matches SET failures = failures + 1 "
+                             "WHERE swid = ?", (swid,))
+            failures, = self._db.execute(
+                    "SELECT failures FROM matches WHERE swid = ?",
+                    (swid,)).fetchone()
+            delay = min(self.retry_interval * 2 ** (failures - 1),
+                        self.give_up_after)
+            self._db.execute("UPDATE matches SET retry_at = ? WHERE swid = ?",
+                             (now + delay, swid))
+            self._db.commit()
+
+    def due(self, swids=None, now=None):
+        """Return the swids of the matches to fetch, oldest first.
+
+        If `swids` is given, only these matches are considered. During a run,
+        `now` defaults to the time at which the run began.
+        """
+        if now is None:
+            now = self.run_started or time.time()
+        query = (
+            "SELECT swid FROM matches WHERE final = 0 AND ("
+            "fetched IS NULL"
+            # Failed, and its back-off delay has elapsed.
+            " OR failures > 0"
+            # Not fetched since the kick-off.
+            " OR (timestamp <= :now AND fetched < timestamp)"
+            # Live.
+            " OR (timestamp <= :now AND timestamp > :now - :window"
+            "     AND fetched < :now - :live)"
+            # Upcoming, or waiting for the result.
+            " OR (timestamp > :now - :give_up AND fetched < :now - :upcoming)"
+            ") AND (retry_at IS NULL OR retry_at <= :now)")
+        params = {
+            'now': now,
+            'upcoming': self.upcoming_interval,
+            'window': self.live_window,
+            'live': self.live_interval,
+            'give_up': self.give_up_after,
+        }
+        if swids is not None:
+            query += " AND swid IN (SELECT value FROM json_each(:swids))"
+            params['swids'] = json.dumps(list(swids))
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY timestamp, swid",
+                                    params).fetchall()
+        return [row[0] for row in rows]
+
+    def settled(self, matches):
+        """Whether all of `matches` are known and have a final score."""
+        swids = [match['swid'] for match in matches]
+        with self._lock:
+            count = self._db.execute(
+                    "SELECT COUNT(*) FROM matches WHERE final = 1 "
+                    "AND swid IN ({})".format(", ".join("?" * len(swids))),
+                    swids).fetchone()[0]
+        return len(swids) > 0 and count == len(set(swids))
+
+    @property
+    def watermark(self):
+        """Timestamp before which all the known matches have a final score.
+
+        New matches are expected past it. `None` if no match is known.
+        """
+        with self._lock:
+            pending, latest = self._db.execute(
+                    "SELECT MIN(CASE WHEN final = 0 THEN timestamp END), "
+                    "MAX(timestamp) FROM matches").fetchone()
+        return pending if pending is not None else latest
+
+    def begin_run(self, now=None):
+        """Start a run, or resume the one that was interrupted."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO meta VALUES "
+                             "('run_started', ?)", (now,))
+            self._db.commit()
+        return self.run_started
+
+    def end_run(self):
+        with self._lock:
+            self._db.execute("DELETE FROM meta WHERE key = 'run_started'")
+            self._db.commit()
+
+    @property
+    def run_started(self):
+        """Time at which the current run began, `None` outside of runs."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta "
+                                   "WHERE key = 'run_started'").fetchone()
+        return None if row is None else row[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                    "SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,182 @@
+"""Per-host rate limiting with adaptive concurrency.
+
+Requests to each host go through a token bucket, which caps their rate, and
+a concurrency limit, which adapts to how the host copes with the load:
+it grows additively while requests succeed, and is cut multiplicatively when
+the host throttles (429), fails (5xx, connection errors) or gets slower than
+`latency_target`. Throttled and failed requests are retried with a jittered
+exponential backoff, and `Retry-After` headers are honored by pausing all
+the requests to the host.
+
+A limiter is plugged into a transport::
+
+    limiter = RateLimiter(rate=2, rates={"www.betexplorer.com": 0.5})
+    set_transport(Transport(limiter=limiter))
+"""
+
+import email.utils
+import random
+import threading
+import time
+import urllib.parse
+
+import requests
+
+
+# Status codes of the responses that are worth retrying.
+TRANSIENT = frozenset((429, 500, 502, 503, 504))
+
+
+class RateLimiter:
+
+    """Schedule requests per host.
+
+    `rate` is the number of requests per second allowed for each host
+    (`rates` overrides it for specific hosts), and `burst` the size of the
+    token buckets. The concurrency limit of each host starts at
+    `concurrency` and stays between `min_concurrency` and `max_concurrency`.
+    Transient failures are retried up to `retries` times, waiting up to
+    `backoff * 2 ** attempt` seconds (capped at `max_backoff`) in between.
+    """
+
+    def __init__(self, rate=5.0, burst=5, rates=None, concurrency=4,
+                 min_concurrency=1, max_concurrency=32, latency_target=None,
+                 retries=3, backoff=0.5, max_backoff=60.0):
+        self.rate = rate
+        self.burst = burst
+        self.rates = dict() if rates is None else dict(rates)
+        self.concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._hosts = dict()
+
+    def call(self, url, send):
+        """Send a request to `url` with `send()`, and return the response.
+
+        The last response (or exception) is returned (or raised) once the
+        retries are exhausted.
+        """
+        host = self._host(urllib.parse.urlsplit(url).netloc)
+        for attempt in range(self.retries + 1):
+            host.acquire()
+            start = time.monotonic()
+            try:
+                res = send()
+            except BaseException as exc:
+                # The slot is released whatever the error, so that it
+                # doesn't leak. Only network errors are retried, and only
+                # they tell something about the load of the host.
+                retryable = isinstance(
+                        exc, (requests.ConnectionError, requests.Timeout))
+                host.release(ok=False if retryable else None)
+                if not retryable or attempt == self.retries:
+                    raise
+            else:
+                latency = time.monotonic() - start
+                if res.status_code not in TRANSIENT:
+                    slow = (self.latency_target is not None
+                            and latency > self.latency_target)
+                    host.release(ok=not slow)
+                    return res
+                host.release(ok=False)
+                delay = retry_after(res)
+                if delay is not None:
+                    host.pause(delay)
+                if attempt == self.retries:
+                    return res
+                # Give the connection back to the pool, in case the
+                # response is streamed.
+                res.close()
+            host.retries += 1
+            time.sleep(random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def stats(self):
+        """Map hosts to their concurrency limit, requests in flight and
+        number of retries."""
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {name: {
+            'limit': host.limit,
+            'in_flight': host.in_flight,
+            'retries': host.retries,
+        } for name, host in hosts.items()}
+
+    def _host(self, name):
+        with self._lock:
+            if name not in self._hosts:
+                self._hosts[name] = _Host(self, self.rates.get(name, self.rate))
+            return self._hosts[name]
+
+
+class _Host:
+
+    # Token bucket and AIMD concurrency limit of a host.
+
+    def __init__(self, limiter, rate):
+        self.rate = rate
+        self.burst = limiter.burst
+        self.min = limiter.min_concurrency
+        self.max = limiter.max_concurrency
+        self.limit = float(limiter.concurrency)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.retries = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.paused_until:
+                    self._cond.wait(self.paused_until - now)
+                elif self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                elif self.tokens < 1:
+                    self._cond.wait((1 - self.tokens) / self.rate)
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+
+    def release(self, ok):
+        # `ok` is `None` if the outcome says nothing about the host.
+        with self._cond:
+            self.in_flight -= 1
+            if ok:
+                # Additive increase, about one more request per round trip.
+                self.limit = min(self.max, self.limit + 1 / self.limit)
+            elif ok is not None:
+                self.limit = max(self.min, self.limit / 2)
+            self._cond.notify_all()
+
+    def pause(self, delay):
+        with self._cond:
+            self.paused_until = max(self.paused_until,
+                                    time.monotonic() + delay)
+
+
+def retry_after(res):
+    """Return the delay requested by the `Retry-After` header, in seconds."""
+    value = res.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
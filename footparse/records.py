@@ -0,0 +1,84 @@
+"""Compact record types.
+
+Pages return their tables as dicts by default. When holding many of them in
+memory, pages can return these records instead (see the `RECORDS` attribute
+of `soccerway.MatchPage` and `eloratings.TeamPage`). Records are named tuples,
+so they have no per-instance dict, and their team, player and competition
+names are interned, so that repeated names are stored once. `to_dict()`
+returns the dict the page would have returned otherwise.
+"""
+
+import collections
+import sys
+
+
+def _intern(string):
+    return None if string is None else sys.intern(string)
+
+
+class Event(collections.namedtuple('Event', 'type minute')):
+
+    __slots__ = ()
+
+    def to_dict(self):
+        res = {'type': self.type}
+        if self.minute is not None:
+            res['minute'] = self.minute
+        return res
+
+
+class Player(collections.namedtuple(
+        'Player', 'shirt_number display_name swid subst_out subst_in events')):
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, attr):
+        events = tuple(Event(event['type'], event.get('minute'))
+                       for event in attr['events'])
+        return cls(attr.get('shirt_number'), _intern(attr['display_name']),
+                   attr['swid'], attr.get('subst_out'), attr.get('subst_in'),
+                   events)
+
+    def to_dict(self):
+        res = dict()
+        if self.shirt_number is not None:
+            res['shirt_number'] = self.shirt_number
+        res['display_name'] = self.display_name
+        res['swid'] = self.swid
+        if self.subst_out is not None:
+            res['subst_out'] = self.subst_out
+        if self.subst_in is not None:
+            res['subst_in'] = self.subst_in
+        res['events'] = [event.to_dict() for event in self.events]
+        return res
+
+
+class EloTeam(collections.namedtuple(
+        'EloTeam', 'name goals rating_diff rating rank_diff rank')):
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class EloEntry(collections.namedtuple(
+        'EloEntry', 'date competition team1 team2')):
+
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, dt, competition, names, *pairs):
+        """Build an entry from the values of `eloratings.TeamPage._parse_row`."""
+        team1, team2 = (EloTeam(_intern(names[i]), *(pair[i] for pair in pairs))
+                        for i in (0, 1))
+        return cls(dt, _intern(competition), team1, team2)
+
+    def to_dict(self):
+        return {
+            'date': self.date,
+            'competition': self.competition,
+            'team1': self.team1.to_dict(),
+            'team2': self.team2.to_dict(),
+        }
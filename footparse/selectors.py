@@ -0,0 +1,80 @@
+"""Registry of the precompiled XPath selectors used by the pages.
+
+Selectors are declared as class attributes of the page classes, and are
+registered under the name `<module>.<class>.<attribute>`. Parametrized
+expressions use XPath variables instead of being rebuilt with `str.format`.
+
+Timing can be turned on to find out which selectors dominate the parsing
+cost::
+
+    selectors.enable_timing()
+    ...  # Parse some pages.
+    for name, calls, seconds in selectors.timings():
+        print(name, calls, seconds)
+"""
+
+import collections
+import threading
+import time
+
+from lxml import etree
+
+
+# Maps names to selectors.
+REGISTRY = dict()
+
+_TIMING = False
+_LOCK = threading.Lock()
+_CALLS = collections.Counter()
+_SECONDS = collections.Counter()
+
+
+class Selector:
+
+    def __init__(self, expr):
+        self.expr = expr
+        self.name = None
+        self._xpath = etree.XPath(expr)
+
+    def __set_name__(self, owner, name):
+        self.name = "{}.{}.{}".format(
+                owner.__module__.rpartition(".")[2], owner.__qualname__, name)
+        REGISTRY[self.name] = self
+
+    def __call__(self, node, **variables):
+        if not _TIMING:
+            return self._xpath(node, **variables)
+        start = time.perf_counter()
+        try:
+            return self._xpath(node, **variables)
+        finally:
+            elapsed = time.perf_counter() - start
+            with _LOCK:
+                _CALLS[self.name] += 1
+                _SECONDS[self.name] += elapsed
+
+    def __repr__(self):
+        return "Selector({!r})".format(self.expr)
+
+
+def enable_timing():
+    global _TIMING
+    _TIMING = True
+
+
+def disable_timing():
+    global _TIMING
+    _TIMING = False
+
+
+def reset_timings():
+    with _LOCK:
+        _CALLS.clear()
+        _SECONDS.clear()
+
+
+def timings():
+    """Return `(name, calls, seconds)` tuples, most expensive first."""
+    with _LOCK:
+        res = [(name, _CALLS[name], _SECONDS[name]) for name in _CALLS]
+    return sorted(res, key=lambda x: x[2], reverse=True)
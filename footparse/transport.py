@@ -0,0 +1,111 @@
+"""HTTP transport shared by all the pages.
+
+Every page fetched with `BasePage.from_url` (and every auxiliary request made
+by the pages themselves) goes through a `Transport`. By default, a single
+process-wide instance is used, so that connections to a given host are pooled
+and kept alive across requests. A custom instance can be installed with
+`set_transport`, or passed explicitly to `from_url`.
+"""
+
+import threading
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+
+USER_AGENT = ("Mozilla/5.0 (iPhone14,3; U; CPU iPhone OS 15_0 like Mac OS X) "
+    "AppleWebKit/602.1.50 (KHTML, like Gecko) "
+    "Version/10.0 Mobile/19A346 Safari/602.1")
+
+
+class Transport:
+
+    """Thin wrapper around a `requests.Session` with per-host pools.
+
+    `pool_connections` is the number of hosts for which a pool is kept, and
+    `pool_maxsize` the number of connections kept alive in each pool. If
+    `pool_block` is true, requests wait for a free connection instead of
+    opening (and later discarding) an extra one. If a `cache` (see
+    `footparse.cache.ResponseCache`) is given, GET requests go through it. If
+    a `recorder` (see `footparse.archive.WarcWriter`) is given, the responses
+    are written to it. If a `limiter` (see `footparse.ratelimit.RateLimiter`)
+    is given, the requests that hit the network are scheduled by it.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, timeout=30, headers=None, cache=None,
+                 recorder=None, limiter=None):
+        self.timeout = timeout
+        self.cache = cache
+        self.recorder = recorder
+        self.limiter = limiter
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+        if headers is not None:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        for prefix in ("http://", "https://"):
+            self.session.mount(prefix, adapter)
+
+    def get(self, url, page_cls=None, **kwargs):
+        """Send a GET request to `url`.
+
+        `page_cls` is the class of the page being fetched, if any. It is used
+        to pick the cache TTL.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if self.cache is None or kwargs.get("stream", False):
+            res = self._send(url, **kwargs)
+        else:
+            extra = kwargs.pop("headers", None) or dict()
+
+            def fetch(headers):
+                return self._send(url, headers={**extra, **headers}, **kwargs)
+
+            res = self.cache.get(url, fetch, page_cls=page_cls)
+        if self.recorder is not None and not kwargs.get("stream", False):
+            self.recorder.write_response(res)
+        return res
+
+    def close(self):
+        self.session.close()
+
+    def _send(self, url, **kwargs):
+        if self.limiter is None:
+            return self.session.get(url, **kwargs)
+        return self.limiter.call(url, lambda: self.session.get(url, **kwargs))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_TRANSPORT = None
+_LOCK = threading.Lock()
+
+
+def get_transport():
+    """Return the process-wide transport, creating it if needed."""
+    global _TRANSPORT
+    with _LOCK:
+        if _TRANSPORT is None:
+            _TRANSPORT = Transport()
+        return _TRANSPORT
+
+
+def set_transport(transport):
+    """Install `transport` as the process-wide transport.
+
+    Returns the previously installed transport (possibly `None`).
+    """
+    global _TRANSPORT
+    with _LOCK:
+        previous, _TRANSPORT = _TRANSPORT, transport
+        return previous
@@ -24,6 +24,10 @@ setup(name='footparse',
           'requests',
           'lxml',
       ],
+      extras_require={
+          'numpy': ['numpy'],
+          'arrow': ['numpy', 'pyarrow'],
+      },
       setup_requires=['pytest-runner'],
       tests_require=['pytest'],
       include_package_data=True,
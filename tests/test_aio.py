@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+import requests
+
+from footparse import eloratings, soccerway
+from footparse.aio import fetch_many
+from testutils import FakeTransport
+
+
+ROUTES = {
+    soccerway.MatchPage.make_url(2024887): 'soccerway_match.html',
+    soccerway.MatchPage.make_url(1): 'soccerway_match2.html',
+    soccerway.TeamPage.make_url(418): 'soccerway_team.html',
+}
+
+
+async def collect(*args, **kwargs):
+    return [page async for page in fetch_many(*args, **kwargs)]
+
+
+def test_from_url_async():
+    fake = FakeTransport(ROUTES)
+    url = soccerway.TeamPage.make_url(418)
+    coro = soccerway.TeamPage.from_url_async(url, transport=fake)
+    page = asyncio.run(coro)
+    assert page.url == url
+    assert page.swid == 418
+
+
+def test_from_url_async_homepage():
+    # The page must not be fetched again by `HomePage.load`.
+    fake = FakeTransport({eloratings.HomePage.URL: 'eloratings_home.html'})
+    coro = eloratings.HomePage.from_url_async(eloratings.HomePage.URL,
+                                              transport=fake)
+    page = asyncio.run(coro)
+    assert page.date.year == 2016
+    assert fake.requested == [eloratings.HomePage.URL]
+
+
+def test_fetch_many():
+    fake = FakeTransport(ROUTES)
+    urls = [soccerway.MatchPage.make_url(x) for x in (2024887, 1)]
+    pages = asyncio.run(collect(
+            soccerway.MatchPage, urls, concurrency=1, transport=fake))
+    assert sorted(p.url for p in pages) == sorted(urls)
+    assert sorted(fake.requested) == sorted(urls)
+    assert {p.url: p.competition_swid for p in pages} == {
+        urls[0]: 25,
+        urls[1]: 90,
+    }
+
+
+def test_fetch_many_error():
+    fake = FakeTransport(ROUTES)
+    urls = [soccerway.TeamPage.make_url(x) for x in (418, 419)]
+    with pytest.raises(requests.HTTPError):
+        asyncio.run(collect(soccerway.TeamPage, urls, transport=fake))
+
+
+def test_fetch_many_close():
+    fake = FakeTransport(ROUTES)
+    urls = [soccerway.MatchPage.make_url(x) for x in (2024887, 1)] * 10
+
+    async def first():
+        pages = fetch_many(soccerway.MatchPage, urls, concurrency=2,
+                           transport=fake)
+        page = await pages.__anext__()
+        await pages.aclose()
+        return page
+
+    page = asyncio.run(first())
+    assert page.url in urls
+    # The pages beyond the first window are never fetched.
+    assert len(fake.requested) <= 4
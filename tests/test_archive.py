@@ -0,0 +1,98 @@
+import gzip
+import io
+import tarfile
+
+import pytest
+
+from footparse import archive, eloratings, fifa, soccerway
+from footparse.transport import Transport
+from testutils import data_path, FakeTransport
+
+
+ROUTES = {
+    soccerway.MatchPage.make_url(2024887): 'soccerway_match.html',
+    soccerway.MatchesBlock.URL_TEMPLATE.format(swid=54142, page=0):
+        'soccerway_block1.json',
+    eloratings.HomePage.URL: 'eloratings_home.html',
+    eloratings.TeamPage.absolute_url('Germany.htm'): 'eloratings_germany.html',
+    fifa.RankingPage.URL: 'fifa_home.html',
+}
+
+
+def test_route():
+    for url in ROUTES:
+        assert archive.route(url) is not None
+    assert archive.route(soccerway.RoundPage.make_url(1)) is soccerway.RoundPage
+    assert archive.route(soccerway.SeasonPage.make_url(1)) \
+            is soccerway.SeasonPage
+    assert archive.route("http://www.example.com/") is None
+
+
+@pytest.mark.parametrize("fname", ["crawl.warc", "crawl.warc.gz"])
+def test_warc_roundtrip(tmp_path, fname):
+    path = str(tmp_path / fname)
+    fake = FakeTransport(ROUTES)
+    with archive.WarcWriter(path) as writer:
+        for url in ROUTES:
+            writer.write_response(fake.get(url))
+        # Failed responses are stored, but not read back.
+        writer.write_response(fake.get("http://www.eloratings.net/Nope.htm"))
+    pages = dict(archive.read_warc(path))
+    assert list(pages) == list(ROUTES)
+    page = pages[soccerway.MatchPage.make_url(2024887)]
+    assert isinstance(page, soccerway.MatchPage)
+    assert page.swid == 2024887
+    assert pages[eloratings.HomePage.URL].url == eloratings.HomePage.URL
+    assert len(pages[eloratings.HomePage.URL].ratings) == 234
+    assert pages[fifa.RankingPage.URL].ratings[0]['team_name'] == 'Argentina'
+
+
+def test_warc_gzip_members(tmp_path):
+    path = str(tmp_path / "crawl.warc.gz")
+    fake = FakeTransport(ROUTES)
+    with archive.WarcWriter(path) as writer:
+        writer.write_response(fake.get(fifa.RankingPage.URL))
+    with open(path, "rb") as f:
+        data = f.read()
+    # One member for the warcinfo record, one for the response.
+    assert data.count(b"\x1f\x8b\x08") >= 2
+    assert gzip.decompress(data).startswith(b"WARC/1.0\r\n")
+
+
+def test_warc_http_encodings():
+    body = gzip.compress(b"<html><h1>World Football Elo Ratings: Italy</h1>")
+    chunked = b"%x\r\n%s\r\n0\r\n\r\n" % (len(body), body)
+    http = (b"HTTP/1.1 200 OK\r\nContent-Encoding: gzip\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n" + chunked)
+    warc = (b"WARC/1.0\r\nWARC-Type: response\r\n"
+            b"WARC-Target-URI: http://www.eloratings.net/Italy.htm\r\n"
+            b"Content-Length: %d\r\n\r\n%s\r\n\r\n" % (len(http), http))
+    [(url, page)] = archive.read_warc(io.BytesIO(warc))
+    assert page.country == "Italy"
+
+
+def test_read_tar(tmp_path):
+    path = str(tmp_path / "crawl.tar.gz")
+    with tarfile.open(path, "w:gz") as tar:
+        tar.add(data_path('eloratings_home.html'),
+                arcname="www.eloratings.net/index.html")
+        tar.add(data_path('eloratings_germany.html'),
+                arcname="www.eloratings.net/Germany.htm")
+        tar.add(data_path('fifa_home.html'), arcname="www.example.com/x.html")
+    pages = dict(archive.read_tar(path))
+    assert sorted(pages) == ["http://www.eloratings.net/",
+                             "http://www.eloratings.net/Germany.htm"]
+    assert pages["http://www.eloratings.net/Germany.htm"].country == "Germany"
+
+
+def test_transport_recorder(tmp_path, monkeypatch):
+    path = str(tmp_path / "crawl.warc")
+    fake = FakeTransport(ROUTES)
+    with archive.WarcWriter(path) as writer:
+        transport = Transport(recorder=writer)
+        monkeypatch.setattr(transport.session, "get",
+                            lambda url, **kwargs: fake.get(url))
+        eloratings.HomePage.load(transport=transport)
+    [(url, page)] = archive.read_warc(path)
+    assert url == eloratings.HomePage.URL
+    assert page.date == eloratings.HomePage.load(transport=fake).date
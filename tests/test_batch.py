@@ -0,0 +1,37 @@
+import os
+
+from footparse import batch, eloratings, soccerway
+from testutils import data_path
+
+
+MATCHES = [
+    'soccerway_match.html',
+    'soccerway_match2.html',
+    'soccerway_match_events.html',
+    'soccerway_match_subst.html',
+    'soccerway_match_nonum.html',
+]
+
+
+def test_parse_dir_paths():
+    paths = [data_path(fname) for fname in MATCHES]
+    res = list(batch.parse_dir(soccerway.MatchPage, paths,
+                               ['swid', 'info', 'starters'],
+                               workers=2, chunksize=2))
+    assert [path for path, _ in res] == paths
+    for path, record in res:
+        page = soccerway.MatchPage.from_file(path)
+        assert record == {
+            'swid': page.swid,
+            'info': page.info,
+            'starters': page.starters,
+        }
+
+
+def test_parse_dir_directory():
+    res = dict(batch.parse_dir(eloratings.TeamPage, data_path(),
+                               ['country'], workers=2, ordered=False))
+    assert len(res) == len(os.listdir(data_path()))
+    assert res[data_path('eloratings_germany.html')] == {'country': 'Germany'}
+    # Other pages can't be parsed as Elo team pages.
+    assert isinstance(res[data_path('fifa_home.html')], Exception)
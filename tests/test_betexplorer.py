@@ -1,7 +1,9 @@
 import pytest
+import requests
 
-from footparse.betexplorer import CompetitionPage, MatchPage, OddsPage
-from testutils import data_path
+from footparse.betexplorer import (
+    CompetitionPage, MatchPage, OddsPage, OddsScraper)
+from testutils import data_path, FakeTransport
 from datetime import date
 
 
@@ -15,6 +17,24 @@ def test_competitionpage_matches():
     assert len(matches) == 319
 
 
+def test_competitionpage_stages():
+    path = data_path('betexplorer_euro_2016.html')
+    page = CompetitionPage.from_file(path)
+    assert page.stage_ids == ['dUrwfoKI', 'zLssg5ZO', '27qZfR4C', 'fkpfJlCP']
+    # Serve the competition page itself for every stage.
+    template = "http://www.betexplorer.com/soccer/europe/euro/results/?stage={}"
+    urls = [template.format(stage_id) for stage_id in page.stage_ids]
+    page.transport = FakeTransport(
+            {url: 'betexplorer_euro_2016.html' for url in urls})
+    matches = list(page.matches_ids)
+    assert len(matches) == 4 * 15
+    assert matches[0] == '4QdyLF2I'
+    assert sorted(page.transport.requested) == sorted(urls)
+    # Stages are only fetched once.
+    assert list(page.matches_ids) == matches
+    assert len(page.transport.requested) == 4
+
+
 @pytest.mark.skip(reason="BetExplorer layout has changed")
 def test_matchpage_odds():
     # It should retrieve the odds for Switzerland - France during the Euro 2016
@@ -59,6 +79,93 @@ def test_oddspage():
     }
 
     assert page.odds_id == "1x2"
+    assert list(page.odds_ids) == ['1x2', 'ou', 'ah', 'ha', 'dc', 'bts']
     assert page.type == "1X2 Odds"
     assert len(odds) == 25
     assert odds[0] == truth
+
+
+class FakeCompetitionPage:
+
+    def __init__(self, matches_ids):
+        self.matches_ids = matches_ids
+
+
+def odds_routes(match_ids):
+    routes = dict()
+    for match_id in match_ids:
+        url = MatchPage.get_url_from_id(match_id)
+        routes[url] = 'betexplorer_euro_2016_swi_fra.html'
+        url = MatchPage._ODDS_URL_TEMPLATE.format(match_id=match_id)
+        routes[url] = 'betexplorer_euro_2016_swi_fra_odds_1x2.html'
+        # Serve the same odds page for every market.
+        for odds_id in ('1x2', 'ou', 'ah', 'ha', 'dc', 'bts'):
+            url = OddsPage.get_url_from_ids(match_id, odds_id)
+            routes[url] = 'betexplorer_euro_2016_swi_fra_odds_1x2.html'
+    return routes
+
+
+class RecordingTransport(FakeTransport):
+
+    """Record the page class of every request."""
+
+    def __init__(self, routes):
+        super().__init__(routes)
+        self.classes = list()
+
+    def get(self, url, page_cls=None, **kwargs):
+        self.classes.append(page_cls)
+        return super().get(url, **kwargs)
+
+
+def test_matchpage_odds_page_class():
+    # The class of the fetched page picks the cache TTL.
+    fake = RecordingTransport(odds_routes(['UB0TAndB']))
+    page = MatchPage.from_url(MatchPage.get_url_from_id('UB0TAndB'),
+                              transport=fake)
+    assert page.odds_page.odds_id == '1x2'
+    assert fake.classes == [MatchPage, OddsPage]
+
+
+def test_oddsscraper():
+    fake = FakeTransport(odds_routes(['UB0TAndB']))
+    scraper = OddsScraper(FakeCompetitionPage(['UB0TAndB']), transport=fake)
+    odds = list(scraper.scrape(types=('1x2',)))
+    assert len(odds) == 25
+    assert odds[0]["match_id"] == 'UB0TAndB'
+    assert odds[0]["company_name"] == "10Bet"
+    assert set(scraper.errors) == set()
+    # The default market is reused, and unwanted markets are not fetched.
+    assert fake.requested == [
+        MatchPage.get_url_from_id('UB0TAndB'),
+        MatchPage._ODDS_URL_TEMPLATE.format(match_id='UB0TAndB'),
+    ]
+    # Other markets are fetched separately.
+    fake.requested.clear()
+    odds = list(scraper.scrape(types=('1x2', 'ou')))
+    assert len(odds) == 2 * 25
+    assert fake.requested[2:] == [OddsPage.get_url_from_ids('UB0TAndB', 'ou')]
+
+
+def test_oddsscraper_concurrent():
+    # Every match page points to the same match.
+    ids = ['UB0TAndB', 'missing', 'UB0TAndB']
+    fake = FakeTransport(odds_routes(['UB0TAndB']))
+    scraper = OddsScraper(FakeCompetitionPage(ids), transport=fake)
+    odds = list(scraper.scrape(types=('1x2',), workers=3,
+                               limits={'match': 2, 'odds': 1}))
+    assert len(odds) == 2 * 25
+    assert set(scraper.errors) == {'missing'}
+
+
+def test_oddsscraper_bad_page():
+    ids = ['UB0TAndB', 'broken']
+    routes = odds_routes(ids)
+    # The match page of "broken" can be fetched but not parsed.
+    routes[MatchPage.get_url_from_id('broken')] = 'fifa_home.html'
+    scraper = OddsScraper(FakeCompetitionPage(ids),
+                          transport=FakeTransport(routes))
+    odds = list(scraper.scrape(types=('1x2',), workers=2))
+    assert len(odds) == 25
+    assert set(scraper.errors) == {'broken'}
+    assert not isinstance(scraper.errors['broken'], requests.RequestException)
@@ -0,0 +1,125 @@
+import requests
+
+from footparse import soccerway
+from footparse.cache import ResponseCache
+from footparse.transport import Transport
+
+
+URL = "https://int.soccerway.com/teams/-/-/418/"
+
+
+class FakeServer:
+
+    def __init__(self, body=b"<html></html>", etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = list()
+
+    def __call__(self, headers):
+        self.requests.append(headers)
+        res = requests.Response()
+        res.url = URL
+        if self.etag is not None and headers.get("If-None-Match") == self.etag:
+            res.status_code = 304
+            res._content = b""
+        else:
+            res.status_code = 200
+            res._content = self.body
+            if self.etag is not None:
+                res.headers["ETag"] = self.etag
+        return res
+
+
+def test_cache_hit(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), default_ttl=None)
+    server = FakeServer()
+    assert cache.get(URL, server).content == server.body
+    res = cache.get(URL, server)
+    assert res.content == server.body
+    assert res.from_cache
+    assert len(server.requests) == 1
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["bytes_saved"] == len(server.body)
+
+
+def test_cache_revalidation(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), default_ttl=0)
+    server = FakeServer()
+    cache.get(URL, server)
+    assert cache.get(URL, server).content == server.body
+    assert server.requests == [{}, {"If-None-Match": '"v1"'}]
+    assert cache.stats["revalidated"] == 1
+    # The resource changed.
+    server.etag, server.body = '"v2"', b"<html><body></body></html>"
+    assert cache.get(URL, server).content == server.body
+    assert cache.get(URL, server).content == server.body
+    assert cache.stats["revalidated"] == 2
+    assert cache.stats["misses"] == 2
+
+
+def test_cache_ttls(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"),
+                          ttls={soccerway.SoccerwayPage: None})
+    server = FakeServer()
+    cache.get(URL, server, page_cls=soccerway.TeamPage)
+    cache.get(URL, server, page_cls=soccerway.TeamPage)
+    assert len(server.requests) == 1
+    cache.get(URL, server)
+    assert len(server.requests) == 2
+    assert cache.ttl_for(soccerway.MatchPage) is None
+    assert cache.ttl_for(soccerway.MatchesBlock) == 0
+
+
+def test_cache_persistent(tmp_path):
+    path = str(tmp_path / "cache.db")
+    server = FakeServer()
+    cache = ResponseCache(path, default_ttl=None)
+    cache.get(URL, server)
+    cache.close()
+    cache = ResponseCache(path, default_ttl=None)
+    cache.get(URL, server)
+    assert len(server.requests) == 1
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_size=25,
+                          default_ttl=None)
+    server = FakeServer(body=b"x" * 10, etag=None)
+    for url in ("a", "b", "c"):
+        cache.get(url, server)
+        # Make sure "a" is the most recently used.
+        cache.get("a", server)
+    assert len(cache) == 2
+    assert cache.size == 20
+    cache.get("a", server)
+    cache.get("c", server)
+    assert len(server.requests) == 3
+
+
+def test_cache_size(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path, default_ttl=0)
+    server = FakeServer(body=b"x" * 10, etag=None)
+    cache.get("a", server)
+    cache.get("b", server)
+    # Replaced responses only count once.
+    server.body = b"x" * 15
+    cache.get("a", server)
+    assert cache.size == 25
+    cache.close()
+    cache = ResponseCache(path, default_ttl=0)
+    assert cache.size == 25
+    cache.clear()
+    assert cache.size == 0
+
+
+def test_transport_cache(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "cache.db"), default_ttl=None)
+    transport = Transport(cache=cache)
+    server = FakeServer()
+    monkeypatch.setattr(transport.session, "get",
+                        lambda url, headers, **kwargs: server(headers))
+    transport.get(URL, page_cls=soccerway.TeamPage)
+    assert transport.get(URL).from_cache
+    assert len(server.requests) == 1
@@ -0,0 +1,75 @@
+import datetime
+import pytest
+
+from footparse import columnar, eloratings, fifa, soccerway
+from testutils import data_path
+
+np = pytest.importorskip("numpy")
+
+
+def test_elo_entries():
+    page = eloratings.TeamPage.from_file(data_path('eloratings_germany.html'))
+    array = columnar.elo_entries(page)
+    assert len(array) == len(page.entries)
+    first = page.entries[0]
+    assert array['date'][0] == np.datetime64(first['date'])
+    assert array['team1_name'][0] == first['team1']['name']
+    assert array['team2_rating'][0] == first['team2']['rating']
+    # Missing values are masked.
+    assert first['team2']['rank_diff'] is None
+    assert array['team2_rank_diff'].mask[0]
+    assert not array['team1_rank_diff'].mask[0]
+
+
+def test_elo_ratings():
+    page = eloratings.HomePage.from_file(data_path('eloratings_home.html'))
+    array = columnar.elo_ratings(page)
+    assert len(array) == len(page.ratings)
+    assert array[1]['team'] == 'Germany'
+    assert array[1]['href'] == 'Germany.htm'
+    assert array['rating'].dtype == np.int32
+
+
+def test_elo_ratings_incomplete():
+    page = eloratings.HomePage(
+            '<table rules="groups"><tr><td>1</td>'
+            '<td><a href="Brazil.htm">Brazil</a></td><td>2100</td></tr>'
+            '</table>')
+    assert page.ratings[0] == {
+        'rank': 1, 'href': 'Brazil.htm', 'team': 'Brazil', 'rating': 2100}
+    array = columnar.elo_ratings(page)
+    assert array[0]['href'] == 'Brazil.htm'
+    assert array[0]['rating'] == 2100
+    assert array.mask[0]['goals_against']
+
+
+def test_fifa_ratings():
+    page = fifa.RankingPage.from_file(data_path('fifa_home.html'))
+    array = columnar.fifa_ratings(page)
+    assert array[0]['team_name'] == 'Argentina'
+    assert array['points'][0] == 1646
+
+
+def test_matches():
+    page = soccerway.SeasonPage.from_file(data_path('soccerway_season_cl.html'))
+    array = columnar.matches(page)
+    assert len(array) == len(page.matches)
+    assert list(array['swid'][:2]) == [3288329, 3288327]
+    # The first match has not been played yet.
+    assert array['team1_goals'].mask.tolist()[:2] == [True, False]
+    block = soccerway.MatchesBlock.from_file(data_path('soccerway_block1.json'))
+    array = columnar.matches(block)
+    assert array[3]['team1_name'] == 'Shakhtar Donetsk'
+    assert array[3]['team2_goals'] == 3
+
+
+def test_to_arrow():
+    pytest.importorskip("pyarrow")
+    page = soccerway.SeasonPage.from_file(data_path('soccerway_season_cl.html'))
+    batch = columnar.to_arrow(columnar.matches(page))
+    rows = batch.to_pylist()
+    assert rows[0]['team1_goals'] is None
+    assert rows[1]['team2_goals'] == 3
+    page = eloratings.TeamPage.from_file(data_path('eloratings_antigua.html'))
+    batch = columnar.to_arrow(columnar.elo_entries(page))
+    assert isinstance(batch.to_pylist()[0]['date'], datetime.date)
@@ -1,6 +1,6 @@
 from datetime import date
 from footparse import eloratings
-from testutils import data_path
+from testutils import data_path, FakeTransport
 
 
 def test_homepage_date():
@@ -77,3 +77,84 @@ def test_teampage_weird_dates():
     entries = list(page.entries)
     assert entries[25]["date"] == date(1984, 1, 1)
     assert entries[31]["date"] == date(1986, 6, 1)
+
+
+def read_chunks(path, size):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(size), b''):
+            yield chunk
+
+
+def test_teampage_parse_entries():
+    for fname in ('eloratings_germany.html', 'eloratings_antigua.html'):
+        path = data_path(fname)
+        truth = list(eloratings.TeamPage.from_file(path).entries)
+        for size in (1000, 65536):
+            entries = list(eloratings.TeamPage.parse_entries(
+                    read_chunks(path, size)))
+            assert entries == truth
+    # Unknown encodings fall back to UTF-8, as with the whole page.
+    entries = list(eloratings.TeamPage.parse_entries(
+            read_chunks(path, 65536), encoding="x-unknown"))
+    assert entries == truth
+
+
+def test_teampage_stream_entries():
+    url = eloratings.TeamPage.absolute_url('Germany.htm')
+    fake = FakeTransport({url: 'eloratings_germany.html'})
+    entries = eloratings.TeamPage.stream_entries(url, transport=fake)
+    assert next(entries)['date'] == date(1908, 4, 5)
+    assert len(list(entries)) == 918
+
+
+def test_match_key():
+    path = data_path('eloratings_germany.html')
+    entry = eloratings.TeamPage.from_file(path).entries[0]
+    swapped = dict(entry, team1=entry['team2'], team2=entry['team1'])
+    assert eloratings.match_key(swapped) == eloratings.match_key(entry)
+    record = eloratings.TeamPage._parse_entry(
+            eloratings.TeamPage._ROWS(
+                    eloratings.TeamPage.from_file(path).tree)[0],
+            records=True)
+    assert eloratings.match_key(record) == eloratings.match_key(entry)
+
+
+class BrokenTransport(FakeTransport):
+
+    """Serve a page with an invalid score for `Broken.htm`."""
+
+    def get(self, url, **kwargs):
+        res = super().get(url, **kwargs)
+        if url.endswith('Broken.htm'):
+            res._content = res._content.replace(
+                    b'<td>5<br>3</td>', b'<td>5<br>x</td>', 1)
+        return res
+
+
+def test_worldcollector():
+    fake = BrokenTransport({
+        eloratings.HomePage.URL: 'eloratings_home.html',
+        eloratings.TeamPage.absolute_url('Germany.htm'):
+            'eloratings_germany.html',
+        eloratings.TeamPage.absolute_url('Antigua.htm'):
+            'eloratings_antigua.html',
+        # Every match of Germany appears on a second page.
+        eloratings.TeamPage.absolute_url('West_Germany.htm'):
+            'eloratings_germany.html',
+        eloratings.TeamPage.absolute_url('Broken.htm'):
+            'eloratings_germany.html',
+    })
+    germany, antigua = (
+            eloratings.TeamPage.from_file(data_path(fname)).entries
+            for fname in ('eloratings_germany.html', 'eloratings_antigua.html'))
+    collector = eloratings.WorldCollector(workers=4, transport=fake)
+    entries = list(collector.collect(
+            ['Germany.htm', 'West_Germany.htm', 'Broken.htm', 'Antigua.htm',
+             'Nowhere.htm']))
+    assert len(entries) == len(germany) + len(antigua)
+    assert entries[-1] == antigua[-1]
+    assert set(collector.errors) == {'Broken.htm', 'Nowhere.htm'}
+    # By default, the teams are read from the home page.
+    entries = list(collector.collect())
+    assert len(entries) == len(germany) + len(antigua)
+    assert len(collector.errors) == 232
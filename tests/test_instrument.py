@@ -0,0 +1,104 @@
+import pytest
+import requests
+
+from footparse import eloratings, instrument, soccerway
+from testutils import data_path, FakeTransport
+
+
+@pytest.fixture
+def events():
+    events = list()
+
+    def callback(phase, page_cls, seconds, info):
+        events.append((phase, page_cls, info))
+
+    instrument.register(callback)
+    yield events
+    instrument.unregister(callback)
+
+
+def test_events(events):
+    fake = FakeTransport({eloratings.HomePage.URL: 'eloratings_home.html'})
+    page = eloratings.HomePage.load(transport=fake)
+    page.ratings
+    page.ratings
+    phases = [(phase, cls) for phase, cls, _ in events]
+    assert phases == [
+        ("fetch", eloratings.HomePage),
+        ("parse", eloratings.HomePage),
+        ("extract", eloratings.HomePage),
+    ]
+    fetch, parse, extract = (info for _, _, info in events)
+    assert fetch["url"] == eloratings.HomePage.URL
+    assert fetch["status"] == 200
+    assert fetch["bytes"] == parse["bytes"] == len(page.data)
+    assert extract["property"] == "ratings"
+
+
+class TimeoutTransport:
+
+    def get(self, url, **kwargs):
+        raise requests.Timeout("timed out")
+
+
+def test_fetch_error_events(events):
+    with pytest.raises(requests.Timeout):
+        eloratings.HomePage.load(transport=TimeoutTransport())
+    (phase, cls, info), = events
+    assert (phase, cls) == ("fetch", eloratings.HomePage)
+    assert info["status"] is None
+    assert isinstance(info["error"], requests.Timeout)
+    metrics = instrument.Metrics()
+    metrics(phase, cls, 0.1, info)
+    assert ('footparse_responses_total{page="eloratings.HomePage",'
+            'status="error"} 1') in metrics.prometheus()
+
+
+def test_stream_events(events):
+    url = eloratings.TeamPage.absolute_url('Germany.htm')
+    fake = FakeTransport({url: 'eloratings_germany.html'})
+    assert len(list(eloratings.TeamPage.stream_entries(
+            url, transport=fake))) == 919
+    (phase, cls, info), = events
+    assert (phase, cls) == ("fetch", eloratings.TeamPage)
+    assert info["status"] == 200
+    assert "bytes" not in info
+
+
+def test_decode_events(events):
+    path = data_path('soccerway_block1.json')
+    soccerway.MatchesBlock.from_file(path).matches
+    assert [phase for phase, _, _ in events] == ["decode", "extract"]
+
+
+def test_metrics():
+    metrics = instrument.Metrics()
+    instrument.register(metrics)
+    try:
+        fake = FakeTransport({
+            eloratings.HomePage.URL: 'eloratings_home.html',
+        })
+        for _ in range(2):
+            eloratings.HomePage.load(transport=fake).date
+        with pytest.raises(Exception):
+            eloratings.TeamPage.from_name("Nope", transport=fake)
+    finally:
+        instrument.unregister(metrics)
+    text = metrics.prometheus()
+    assert "# TYPE footparse_phase_seconds histogram" in text
+    assert ('footparse_phase_seconds_count{phase="parse",'
+            'page="eloratings.HomePage"} 2') in text
+    assert ('footparse_phase_seconds_bucket{phase="fetch",'
+            'page="eloratings.HomePage",le="+Inf"} 2') in text
+    assert ('footparse_extract_seconds_count{page="eloratings.HomePage",'
+            'property="date"} 2') in text
+    assert ('footparse_responses_total{page="eloratings.TeamPage",'
+            'status="404"} 1') in text
+    assert 'footparse_bytes_total{phase="parse",page="eloratings.HomePage"}' \
+            in text
+
+
+def test_no_hooks():
+    assert instrument.HOOKS == list()
+    page = eloratings.HomePage.from_file(data_path('eloratings_home.html'))
+    assert len(page.ratings) == 234
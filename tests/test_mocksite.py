@@ -0,0 +1,71 @@
+import os.path
+import requests
+import sys
+
+from footparse import soccerway
+from footparse.transport import Transport
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+import bench_crawl  # noqa: E402
+import mocksite  # noqa: E402
+
+
+def test_mocksite_route():
+    with mocksite.MockSite() as site:
+        assert site.route('int.soccerway.com', '/teams/-/-/418/') == (
+                'soccerway_team.html')
+        # Fixture lists are cycled through with the last number of the path.
+        assert site.route('int.soccerway.com', '/matches/-/2/') == (
+                'soccerway_match_events.html')
+        assert site.route('int.soccerway.com', '/matches/-/7/') == (
+                'soccerway_match_events.html')
+        assert site.route('www.eloratings.net', '/') == 'eloratings_home.html'
+        assert site.route('www.fifa.com', '/teams/') is None
+        assert site.route('example.com', '/') is None
+        # Round pages: the first one has a previous page, the others don't.
+        path = '/a/block_competition_matches_summary'
+        assert site.route('int.soccerway.com', path,
+                          'params={"page":0}') == 'soccerway_block1.json'
+        assert site.route('int.soccerway.com', path,
+                          'params={"page":-1}') == 'soccerway_block3.json'
+        assert site.route('int.soccerway.com', path) == 'soccerway_block1.json'
+
+
+def test_mocksite_errors():
+    with mocksite.MockSite(error_rate=1.0) as site:
+        assert site.respond('www.eloratings.net', '/')[0] == 500
+        site.error_rate = 0.0
+        assert site.respond('www.eloratings.net', '/nowhere')[0] == 404
+        site.rate, site.burst = 1e-6, 1
+        site._tokens = 1.0
+        assert site.respond('www.eloratings.net', '/')[0] == 200
+        status, headers, _ = site.respond('www.eloratings.net', '/')
+        assert status == 429
+        assert headers['Retry-After'] == '1'
+
+
+def test_mocksite_install():
+    with mocksite.MockSite() as site:
+        transport = Transport(pool_maxsize=3, pool_block=True)
+        site.install(transport)
+        url = soccerway.TeamPage.make_url(418)
+        adapter = transport.session.get_adapter(url)
+        assert isinstance(adapter, mocksite._LocalAdapter)
+        assert adapter._pool_maxsize == 3
+        assert adapter._pool_block
+        page = soccerway.TeamPage.from_url(url, transport=transport)
+        assert page.country == 'Chile'
+        assert site.responses == {200: 1}
+
+
+def test_bench_crawl_seed_error(capsys):
+    # The home page of Eloratings, which lists the teams, always fails.
+    with mocksite.MockSite(fail_paths=[r'^/$']) as site:
+        assert site.respond('www.eloratings.net', '/')[0] == 500
+        assert site.respond('www.eloratings.net', '/Germany.htm')[0] == 200
+        errors = bench_crawl.run('elo', bench_crawl.elo, site, 2, None)
+        assert isinstance(errors, requests.HTTPError)
+        assert 'aborted' in capsys.readouterr().out
+        # The other scenarios still run.
+        assert bench_crawl.run('season', bench_crawl.season, site, 2,
+                               None) == 0
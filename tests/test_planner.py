@@ -0,0 +1,172 @@
+import time
+
+from footparse import soccerway
+from footparse.planner import RecrawlPlanner
+from testutils import data_path, FakeTransport
+
+
+NOW = 1600000000
+HOUR = 3600
+FINAL = {'score_ft_team1': 1, 'score_ft_team2': 0}
+
+
+def make_planner(tmp_path):
+    return RecrawlPlanner(str(tmp_path / "planner.db"))
+
+
+def test_planner_new_matches(tmp_path):
+    planner = make_planner(tmp_path)
+    matches = [{'swid': 1, 'timestamp': NOW + HOUR},
+               {'swid': 2, 'timestamp': NOW - HOUR}]
+    assert planner.observe(matches) == [1, 2]
+    assert planner.observe(matches) == list()
+    assert planner.due(now=NOW) == [2, 1]
+    assert planner.due([1], now=NOW) == [1]
+    assert planner.due(iter([2, 3]), now=NOW) == [2]
+    assert planner.due([], now=NOW) == list()
+    assert len(planner) == 2
+
+
+def test_planner_freshness(tmp_path):
+    planner = make_planner(tmp_path)
+    planner.observe([
+        {'swid': 1, 'timestamp': NOW - 100 * HOUR},  # Finished.
+        {'swid': 2, 'timestamp': NOW - HOUR},  # Live.
+        {'swid': 3, 'timestamp': NOW + 48 * HOUR},  # Upcoming.
+        {'swid': 4, 'timestamp': NOW - 1000 * HOUR},  # Never played.
+    ])
+    planner.record(1, scores=FINAL, now=NOW)
+    planner.record(2, scores=dict(), now=NOW)
+    planner.record(3, scores=dict(), now=NOW)
+    planner.record(4, scores=dict(), now=NOW)
+    assert planner.due(now=NOW) == list()
+    assert planner.due(now=NOW + 20 * 60) == [2]
+    # The live match is still waiting for its result.
+    assert planner.due(now=NOW + 25 * HOUR) == [2, 3]
+    planner.record(2, scores=FINAL, now=NOW + 25 * HOUR)
+    # The upcoming match has kicked off since it was fetched.
+    assert planner.due(now=NOW + 48 * HOUR + 60) == [3]
+    planner.record(3, scores=FINAL, now=NOW + 50 * HOUR)
+    assert planner.due(now=NOW + 1000 * HOUR) == list()
+
+
+def test_planner_settled(tmp_path):
+    planner = make_planner(tmp_path)
+    matches = [{'swid': 1, 'timestamp': NOW}, {'swid': 2, 'timestamp': NOW}]
+    planner.observe(matches)
+    planner.record(1, scores=FINAL, now=NOW)
+    assert planner.watermark == NOW
+    assert not planner.settled(matches)
+    planner.record(2, {'timestamp': NOW + 1}, FINAL, now=NOW)
+    assert planner.settled(matches)
+    assert planner.watermark == NOW + 1
+    assert not planner.settled(list())
+
+
+def test_planner_failures(tmp_path):
+    planner = make_planner(tmp_path)
+    planner.observe([{'swid': 1, 'timestamp': NOW - 1000 * HOUR}])
+    planner.record_failure(1, now=NOW)
+    assert planner.due(now=NOW) == list()
+    assert planner.due(now=NOW + planner.retry_interval) == [1]
+    # The delay doubles after each failure.
+    planner.record_failure(1, now=NOW + HOUR)
+    assert planner.due(now=NOW + HOUR + planner.retry_interval) == list()
+    assert planner.due(now=NOW + HOUR + 2 * planner.retry_interval) == [1]
+    # Long after the match, it is still fetched again eventually.
+    for _ in range(20):
+        planner.record_failure(1, now=NOW)
+    assert planner.due(now=NOW + planner.give_up_after - 1) == list()
+    assert planner.due(now=NOW + planner.give_up_after) == [1]
+    # Unknown matches can fail as well.
+    planner.record_failure(2, now=NOW)
+    assert planner.due(now=NOW + planner.retry_interval) == [2]
+    # Once fetched, the match follows its usual schedule.
+    planner.record(1, scores=dict(), now=NOW + HOUR)
+    assert planner.due([1], now=NOW + HOUR) == list()
+    planner.record(1, scores=FINAL, now=NOW + HOUR)
+    assert planner.due(now=NOW + 1000 * HOUR) == [2]
+
+
+def test_planner_resume(tmp_path):
+    path = str(tmp_path / "planner.db")
+    planner = RecrawlPlanner(path)
+    planner.observe([{'swid': 1, 'timestamp': NOW - HOUR},
+                     {'swid': 2, 'timestamp': NOW - HOUR}])
+    planner.begin_run(now=NOW)
+    planner.record(1, scores=dict(), now=NOW + 1)
+    planner.close()
+    # The run was interrupted.
+    planner = RecrawlPlanner(path)
+    assert planner.begin_run(now=NOW + HOUR) == NOW
+    assert planner.due() == [2]
+    planner.record(2, scores=dict(), now=NOW + HOUR)
+    planner.end_run()
+    assert planner.run_started is None
+    assert planner.due(now=NOW + 2 * HOUR) == [1, 2]
+
+
+def test_harvester_planner(tmp_path):
+    planner = make_planner(tmp_path)
+    match_url = soccerway.MatchPage.make_url
+    routes = {
+        soccerway.SeasonPage.make_url(7576): 'soccerway_season_euro16.html',
+        soccerway.RoundPage.make_url(31064): 'soccerway_round3.html',
+        match_url(2396119): 'soccerway_match.html',
+    }
+    fake = FakeTransport(routes)
+    harvester = soccerway.SeasonHarvester(
+            7576, workers=2, transport=fake, planner=planner)
+    assert len(list(harvester.harvest())) == 1
+    assert match_url(2396119) in fake.requested
+    # The match had a final score, it isn't fetched again.
+    fake = FakeTransport(routes)
+    harvester = soccerway.SeasonHarvester(
+            7576, workers=2, transport=fake, planner=planner)
+    assert len(list(harvester.harvest())) == 0
+    assert match_url(2396119) not in fake.requested
+    # Failed pages of old matches are backed off, not given up.
+    assert match_url(2396122) not in fake.requested
+    assert planner.due([2396122], now=time.time() + 365 * 24 * HOUR) == [
+        2396122]
+
+
+def test_harvester_planner_upcoming(tmp_path, monkeypatch):
+    path = data_path('soccerway_match_upcoming.html')
+    kickoff = soccerway.MatchPage.from_file(path).info['timestamp']
+    clock = [kickoff - HOUR]
+    monkeypatch.setattr(time, 'time', lambda: clock[0])
+    planner = make_planner(tmp_path)
+    match_url = soccerway.MatchPage.make_url
+    routes = {
+        soccerway.SeasonPage.make_url(7576): 'soccerway_season_euro16.html',
+        soccerway.RoundPage.make_url(31064): 'soccerway_round3.html',
+        match_url(2396119): 'soccerway_match.html',
+        match_url(2396122): 'soccerway_match_upcoming.html',
+    }
+    fake = FakeTransport(routes)
+    harvester = soccerway.SeasonHarvester(
+            7576, workers=2, transport=fake, planner=planner)
+    records = {r['swid']: r for r in harvester.harvest()}
+    assert set(records) == {2396119, 2396122}
+    assert records[2396122]['scores'] == dict()
+    assert ('match', 2396122) not in harvester.errors
+    assert planner.due([2396122]) == list()
+    # A day later, the upcoming matches are fetched again, including the
+    # ones that failed, but not the finished one.
+    clock[0] += planner.upcoming_interval + 1
+    fake = FakeTransport(routes)
+    harvester = soccerway.SeasonHarvester(
+            7576, workers=2, transport=fake, planner=planner)
+    assert [r['swid'] for r in harvester.harvest()] == [2396122]
+    assert match_url(2396119) not in fake.requested
+    assert match_url(2396121) in fake.requested
+    # Long after the matches, the ones without a final score are fetched
+    # once more, then given up, and the failed ones are backed off.
+    clock[0] = 1500000000
+    for expected in ([2396122], []):
+        fake = FakeTransport(routes)
+        harvester = soccerway.SeasonHarvester(
+                7576, workers=2, transport=fake, planner=planner)
+        assert [r['swid'] for r in harvester.harvest()] == expected
+    assert not any('/matches/' in url for url in fake.requested)
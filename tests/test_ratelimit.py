@@ -0,0 +1,162 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from footparse import ratelimit
+from footparse.transport import Transport
+
+
+URL = "https://int.soccerway.com/teams/-/-/418/"
+
+
+class Raw:
+
+    """Stand-in for the connection of a streamed response."""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def release_conn(self):
+        pass
+
+
+def response(status, headers=None):
+    res = requests.Response()
+    res.url = URL
+    res.status_code = status
+    res.headers.update(headers or dict())
+    res.raw = Raw()
+    return res
+
+
+class FlakyServer:
+
+    """Answer with the given statuses, then with 200."""
+
+    def __init__(self, *statuses, headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers
+        self.times = list()
+        self.responses = list()
+
+    def __call__(self):
+        self.times.append(time.monotonic())
+        if self.statuses:
+            status = self.statuses.pop(0)
+            if isinstance(status, Exception):
+                raise status
+            res = response(status, self.headers)
+        else:
+            res = response(200)
+        self.responses.append(res)
+        return res
+
+
+def test_retry_transient():
+    limiter = ratelimit.RateLimiter(rate=1000, backoff=0.001)
+    server = FlakyServer(503, requests.ConnectionError(), 429)
+    assert limiter.call(URL, server).status_code == 200
+    # The retried responses are closed, the returned one isn't.
+    assert [res.raw.closed for res in server.responses] == [True, True, False]
+    assert len(server.times) == 4
+    stats = limiter.stats()["int.soccerway.com"]
+    assert stats["retries"] == 3
+    assert stats["in_flight"] == 0
+    # Not found isn't transient.
+    server = FlakyServer(404)
+    assert limiter.call(URL, server).status_code == 404
+    assert len(server.times) == 1
+
+
+def test_retries_exhausted():
+    limiter = ratelimit.RateLimiter(rate=1000, retries=2, backoff=0.001)
+    server = FlakyServer(500, 500, 500)
+    assert limiter.call(URL, server).status_code == 500
+    server = FlakyServer(*[requests.Timeout()] * 3)
+    with pytest.raises(requests.Timeout):
+        limiter.call(URL, server)
+
+
+def test_non_retryable_error():
+    limiter = ratelimit.RateLimiter(rate=1000, concurrency=2, backoff=0)
+    for _ in range(2):
+        server = FlakyServer(requests.TooManyRedirects())
+        with pytest.raises(requests.TooManyRedirects):
+            limiter.call(URL, server)
+        # Not retried, and the slot is released.
+        assert len(server.times) == 1
+    stats = limiter.stats()["int.soccerway.com"]
+    assert stats["in_flight"] == 0
+    # The host wasn't overloaded, its limit is unchanged.
+    assert stats["limit"] == 2
+    assert limiter.call(URL, FlakyServer()).status_code == 200
+
+
+def test_retry_after():
+    assert ratelimit.retry_after(response(429, {"Retry-After": "12"})) == 12
+    assert ratelimit.retry_after(response(429)) is None
+    past = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert ratelimit.retry_after(response(503, {"Retry-After": past})) == 0
+    limiter = ratelimit.RateLimiter(rate=1000, backoff=0.0)
+    server = FlakyServer(429, headers={"Retry-After": "0.2"})
+    limiter.call(URL, server)
+    assert server.times[1] - server.times[0] >= 0.2
+
+
+def test_token_bucket():
+    limiter = ratelimit.RateLimiter(rate=50, burst=1)
+    server = FlakyServer()
+    for _ in range(6):
+        limiter.call(URL, server)
+    # One token every 20 ms, after the first request.
+    assert server.times[-1] - server.times[0] >= 0.09
+
+
+def test_aimd():
+    limiter = ratelimit.RateLimiter(rate=1000, concurrency=4, backoff=0.0)
+    for _ in range(8):
+        limiter.call(URL, FlakyServer())
+    limit = limiter.stats()["int.soccerway.com"]["limit"]
+    assert 5 < limit < 6
+    limiter.call(URL, FlakyServer(503))
+    assert limiter.stats()["int.soccerway.com"]["limit"] == pytest.approx(
+            (limit / 2) + 1 / (limit / 2))
+
+
+def test_concurrency_limit():
+    limiter = ratelimit.RateLimiter(rate=1000, burst=100, concurrency=2,
+                                    max_concurrency=2)
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def send():
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return response(200)
+
+    threads = [threading.Thread(target=limiter.call, args=(URL, send))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert active[1] == 2
+
+
+def test_transport_limiter(monkeypatch):
+    limiter = ratelimit.RateLimiter(rate=1000, backoff=0.0)
+    transport = Transport(limiter=limiter)
+    server = FlakyServer(502)
+    monkeypatch.setattr(transport.session, "get",
+                        lambda url, **kwargs: server())
+    assert transport.get(URL).status_code == 200
+    assert len(server.times) == 2
@@ -0,0 +1,50 @@
+import pytest
+
+from footparse import eloratings, soccerway
+from footparse.records import EloEntry, Player
+from testutils import data_path
+
+
+class RecordsTeamPage(eloratings.TeamPage):
+    RECORDS = True
+
+
+class RecordsMatchPage(soccerway.MatchPage):
+    RECORDS = True
+
+
+@pytest.mark.parametrize("fname", [
+    'eloratings_germany.html', 'eloratings_antigua.html'])
+def test_elo_entries(fname):
+    path = data_path(fname)
+    entries = eloratings.TeamPage.from_file(path).entries
+    page = RecordsTeamPage.from_file(path)
+    records = page.entries
+    assert all(isinstance(record, EloEntry) for record in records)
+    assert [record.to_dict() for record in records] == list(entries)
+    # Team names are interned.
+    names = [team.name for record in records
+             for team in (record.team1, record.team2)]
+    assert len({id(name) for name in names if name == page.country}) == 1
+
+
+def test_elo_stream_entries():
+    with open(data_path('eloratings_germany.html'), 'rb') as f:
+        records = list(RecordsTeamPage.parse_entries([f.read()]))
+    assert records[0].team1.name == 'Switzerland'
+    assert records[0].team2.rank_diff is None
+
+
+@pytest.mark.parametrize("fname", [
+    'soccerway_match.html', 'soccerway_match_events.html',
+    'soccerway_match_subst.html', 'soccerway_match_nonum.html'])
+def test_lineups(fname):
+    path = data_path(fname)
+    page = soccerway.MatchPage.from_file(path)
+    records = RecordsMatchPage.from_file(path)
+    for prop in ('starters', 'substitutes'):
+        for team in ('team1', 'team2'):
+            players = getattr(records, prop)[team]
+            assert all(isinstance(player, Player) for player in players)
+            assert ([player.to_dict() for player in players]
+                    == getattr(page, prop)[team])
@@ -0,0 +1,28 @@
+from footparse import selectors, soccerway
+from testutils import data_path
+
+
+def test_registry():
+    name = "soccerway.MatchPage._STARTERS"
+    assert selectors.REGISTRY[name] is soccerway.MatchPage._STARTERS
+    assert "eloratings.HomePage._ROWS" in selectors.REGISTRY
+    assert "eloratings.TeamPage._ROWS" in selectors.REGISTRY
+
+
+def test_timing():
+    page = soccerway.MatchPage.from_file(data_path('soccerway_match.html'))
+    selectors.reset_timings()
+    selectors.enable_timing()
+    try:
+        page.starters
+    finally:
+        selectors.disable_timing()
+    stats = {name: calls for name, calls, _ in selectors.timings()}
+    assert stats["soccerway.MatchPage._STARTERS"] == 2
+    # One call per row of the lineups.
+    assert stats["soccerway.MatchPage._PLAYER"] > 22
+    page.starters
+    stats = {name: calls for name, calls, _ in selectors.timings()}
+    assert stats["soccerway.MatchPage._STARTERS"] == 2
+    selectors.reset_timings()
+    assert selectors.timings() == []
@@ -1,6 +1,10 @@
+import glob
+import threading
+import time
+
 from datetime import date
 from footparse import soccerway
-from testutils import data_path
+from testutils import data_path, FakeTransport
 
 
 def test_teampage_country():
@@ -375,6 +379,16 @@ def test_matchlistpage_is_paginated():
     assert page.is_paginated
 
 
+def test_matchesblock_nbsp():
+    # Non-breaking spaces in names are turned into spaces by both engines.
+    path = data_path('soccerway_block_nbsp.json')
+    for engine in ("lxml", "regex"):
+        block = soccerway.MatchesBlock.from_file(path)
+        block.MATCHES_ENGINE = engine
+        names = [m['team1']['name'] for m in block.matches]
+        assert 'Borussia Dortmund' in names
+
+
 def test_matchesblock_info():
     path = data_path('soccerway_block1.json')
     block = soccerway.MatchesBlock.from_file(path)
@@ -425,3 +439,143 @@ def test_matchlistpage_round_swid():
     path = data_path('soccerway_season_superlig.html')
     page = soccerway.SeasonPage.from_file(path)
     assert page.round_swid == 36002
+
+
+def test_matches_regex_engine():
+    """The regex engine gives the same results as lxml."""
+    paths = sorted(glob.glob(data_path('soccerway_round*.html'))
+                   + glob.glob(data_path('soccerway_season*.html')))
+    assert len(paths) > 0
+    for path in paths:
+        truth = soccerway.SeasonPage.from_file(path).matches
+        page = soccerway.SeasonPage.from_file(path)
+        page.MATCHES_ENGINE = "regex"
+        assert len(truth) > 0
+        assert page.matches == truth
+    paths = sorted(glob.glob(data_path('soccerway_block*.json')))
+    assert len(paths) > 0
+    for path in paths:
+        truth = soccerway.MatchesBlock.from_file(path).matches
+        block = soccerway.MatchesBlock.from_file(path)
+        block.MATCHES_ENGINE = "regex"
+        assert block.matches == truth
+
+
+def test_matchesblock_crawl_round():
+    urls = soccerway.MatchesBlock.for_round(54142)
+    # The last page repeats the matches of the first one.
+    fake = FakeTransport({
+        next(urls): 'soccerway_block1.json',
+        next(urls): 'soccerway_block3.json',
+    })
+    matches = list(soccerway.MatchesBlock.crawl_round(
+            54142, prefetch=3, transport=fake))
+    assert len(matches) == 10
+    timestamps = [match['timestamp'] for match in matches]
+    assert timestamps == sorted(timestamps)
+    # Pages 0 to -3, the speculative requests stop with the last page.
+    assert len(fake.requested) <= 4
+
+
+def test_seasonharvester():
+    match_url = soccerway.MatchPage.make_url
+    fake = FakeTransport({
+        soccerway.SeasonPage.make_url(7576): 'soccerway_season_euro16.html',
+        # Two rounds listing the same matches.
+        soccerway.RoundPage.make_url(31064): 'soccerway_round3.html',
+        soccerway.RoundPage.make_url(31063): 'soccerway_round3.html',
+        match_url(2396119): 'soccerway_match.html',
+        match_url(2396122): 'soccerway_match2.html',
+    })
+    harvester = soccerway.SeasonHarvester(7576, workers=2, transport=fake)
+    records = list(harvester.harvest())
+    assert [r['swid'] for r in records] == [2396119, 2396122]
+    assert records[0]['scores']['score_et_team1'] == 1
+    assert records[1]['info']['team1_name'] is not None
+    assert len(records[1]['starters']['team1']) == 11
+    # The other rounds and matches are missing.
+    assert ('round', 31060) in harvester.errors
+    assert sum(kind == 'match' for kind, _ in harvester.errors) == 4
+    # Every page is requested once.
+    assert len(fake.requested) == len(set(fake.requested)) == 1 + 5 + 6
+    progress = harvester.progress()
+    assert progress['pages'] == 12
+    assert progress['records'] == 2
+    assert progress['queue_depth'] == 0
+
+
+def test_seasonharvester_bad_pages():
+    match_url = soccerway.MatchPage.make_url
+    round3 = soccerway.RoundPage.from_file(data_path('soccerway_round3.html'))
+    swids = [m['swid'] for m in round3.matches]
+    fake = FakeTransport({
+        soccerway.SeasonPage.make_url(7576): 'soccerway_season_euro16.html',
+        soccerway.RoundPage.make_url(31064): 'soccerway_round3.html',
+        # Pages that can be fetched but not parsed.
+        soccerway.RoundPage.make_url(31063): 'fifa_home.html',
+        match_url(swids[0]): 'soccerway_person.html',
+        match_url(swids[1]): 'soccerway_match.html',
+    })
+    harvester = soccerway.SeasonHarvester(7576, workers=2, transport=fake)
+    records = list(harvester.harvest())
+    assert [r['swid'] for r in records] == [swids[1]]
+    assert isinstance(harvester.errors[('round', 31063)], IndexError)
+    assert isinstance(harvester.errors[('match', swids[0])], IndexError)
+
+
+def test_seasonharvester_paginated():
+    urls = soccerway.MatchesBlock.for_round(36002)
+    fake = FakeTransport({
+        soccerway.SeasonPage.make_url(12658): 'soccerway_season_superlig.html',
+        next(urls): 'soccerway_block1.json',
+        next(urls): 'soccerway_block3.json',
+    })
+    harvester = soccerway.SeasonHarvester(12658, workers=2, transport=fake)
+    assert list(harvester.harvest()) == list()
+    # The round is read from the blocks rather than from the season page.
+    assert len(harvester.errors) == 10
+
+
+def test_seasonharvester_single_round_error():
+    fake = FakeTransport({
+        soccerway.SeasonPage.make_url(12658): 'soccerway_season_superlig.html',
+    })
+    harvester = soccerway.SeasonHarvester(12658, workers=2, transport=fake)
+    assert list(harvester.harvest()) == list()
+    assert set(harvester.errors) == {('round', 36002)}
+
+
+class SlowTransport(FakeTransport):
+
+    """Record the maximum number of requests in flight."""
+
+    def __init__(self, routes):
+        super().__init__(routes)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.005)
+        try:
+            return super().get(url, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_seasonharvester_bounded():
+    match_url = soccerway.MatchPage.make_url
+    fake = SlowTransport({
+        soccerway.SeasonPage.make_url(7576): 'soccerway_season_euro16.html',
+        soccerway.RoundPage.make_url(31064): 'soccerway_round3.html',
+        soccerway.RoundPage.make_url(31063): 'soccerway_round4.html',
+        match_url(2396119): 'soccerway_match.html',
+    })
+    harvester = soccerway.SeasonHarvester(7576, workers=2, transport=fake)
+    list(harvester.harvest())
+    assert len(fake.requested) > 10
+    assert fake.max_in_flight <= 2
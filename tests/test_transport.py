@@ -0,0 +1,44 @@
+import pytest
+import requests
+
+from footparse import eloratings, transport
+from testutils import FakeTransport
+
+
+def test_transport_pool_config():
+    t = transport.Transport(pool_connections=3, pool_maxsize=7)
+    adapter = t.session.get_adapter("https://int.soccerway.com/")
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 7
+    assert t.session.headers["User-Agent"] == transport.USER_AGENT
+    t = transport.Transport(keep_alive=False)
+    assert t.session.headers["Connection"] == "close"
+
+
+def test_default_transport():
+    previous = transport.set_transport(None)
+    try:
+        t = transport.get_transport()
+        assert isinstance(t, transport.Transport)
+        assert transport.get_transport() is t
+    finally:
+        transport.set_transport(previous)
+
+
+def test_from_url_uses_transport():
+    fake = FakeTransport({eloratings.HomePage.URL: 'eloratings_home.html'})
+    previous = transport.set_transport(fake)
+    try:
+        page = eloratings.HomePage.load()
+    finally:
+        transport.set_transport(previous)
+    assert fake.requested == [eloratings.HomePage.URL]
+    assert page.transport is fake
+    assert len(list(page.ratings)) == 234
+
+
+def test_from_url_explicit_transport():
+    fake = FakeTransport({})
+    with pytest.raises(requests.HTTPError):
+        eloratings.HomePage.load(transport=fake)
+    assert fake.requested == [eloratings.HomePage.URL]
@@ -0,0 +1,176 @@
+import concurrent.futures
+import gc
+import pytest
+import requests
+import sys
+import time
+
+from datetime import date
+from footparse._utils import (
+    bounded_map, cached_property, declared_encoding, float_or_none, int_or_none,
+    parse_date, parse_html, text_of)
+from footparse import _utils, eloratings, selectors, soccerway
+from testutils import data_path
+
+
+def test_parse_html_encoding():
+    text = "<html><body><p>Universidad Católica&nbsp;!</p></body></html>"
+    for encoding in ("utf-8", "latin-1"):
+        raw = text.encode(encoding)
+        tree = parse_html(raw, encoding)
+        assert text_of(tree.xpath("//p")[0]) == "Universidad Católica !"
+    # The declared encoding is used by default.
+    raw = ('<html><head><meta charset="latin-1"></head>' + text[6:])
+    tree = parse_html(raw.encode("latin-1"))
+    assert tree.xpath("//p")[0].text == "Universidad Católica\xa0!"
+    # Unknown encodings are ignored.
+    tree = parse_html(text.encode("utf-8"), "foobar")
+    assert tree.xpath("//p")[0].text == "Universidad Católica\xa0!"
+    # Names that libxml2 knows, but not in Python's spelling.
+    text = "<html><body><p>日本代表</p></body></html>"
+    for encoding in ("EUC-JP", "Shift_JIS"):
+        tree = parse_html(text.encode(encoding), encoding)
+        assert tree.xpath("//p")[0].text == "日本代表"
+        raw = ('<html><head><meta charset="{}"></head>'.format(encoding)
+               + text[6:])
+        tree = parse_html(raw.encode(encoding))
+        assert tree.xpath("//p")[0].text == "日本代表"
+
+
+def test_declared_encoding():
+    res = requests.Response()
+    res.headers["Content-Type"] = "text/html; charset=ISO-8859-1"
+    assert declared_encoding(res) == "ISO-8859-1"
+    res.headers["Content-Type"] = "text/html"
+    assert declared_encoding(res) is None
+
+
+def test_page_from_text():
+    with open(data_path('soccerway_team.html'), encoding="utf-8") as f:
+        page = soccerway.TeamPage(f.read())
+    assert page.name == 'CD Universidad Católica'
+
+
+def test_page_lazy_tree():
+    page = soccerway.TeamPage.from_file(data_path('soccerway_team.html'))
+    assert page._tree is None
+    assert page.swid == 418
+    assert page._tree is not None
+
+
+def test_page_release():
+    path = data_path('soccerway_team.html')
+    with soccerway.TeamPage.from_file(path) as page:
+        assert page.swid == 418
+    assert page.data is None
+    assert page._tree is None
+    # Properties read before the release are still available.
+    assert page.swid == 418
+    with pytest.raises(ValueError):
+        page.country
+    block = soccerway.MatchesBlock.from_file(data_path('soccerway_block1.json'))
+    assert block.has_previous
+    block.release()
+    with pytest.raises(ValueError):
+        block.has_next
+
+
+def test_page_release_parse_date():
+    # Memoized dates must not keep the tree of their page alive.
+    _utils._parse_date.cache_clear()
+    page = soccerway.MatchPage.from_file(data_path('soccerway_match.html'))
+    div = page._DETAILS(page.tree)[0]
+    link = page._DETAILS_LINKS(div)[0].getparent()
+    refs = sys.getrefcount(link)
+    assert page.info['date'] == date(2016, 7, 2)
+    page.release()
+    gc.collect()
+    assert sys.getrefcount(link) == refs
+
+
+def test_cached_properties():
+    page = eloratings.HomePage.from_file(data_path('eloratings_home.html'))
+    ratings = page.ratings
+    assert isinstance(ratings, tuple)
+    assert page.ratings is ratings
+    assert len(list(page.ratings)) == len(list(page.ratings)) == 234
+    page = soccerway.MatchPage.from_file(data_path('soccerway_match.html'))
+    assert page.info is page.info
+    selectors.reset_timings()
+    selectors.enable_timing()
+    try:
+        page.starters
+        page.starters
+    finally:
+        selectors.disable_timing()
+    calls = {name: calls for name, calls, _ in selectors.timings()}
+    assert calls["soccerway.MatchPage._STARTERS"] == 2
+
+
+def test_cached_property_threads():
+    calls = list()
+
+    class Page:
+        @cached_property
+        def value(self):
+            calls.append(None)
+            time.sleep(0.01)
+            return object()
+
+    page = Page()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(executor.map(lambda _: page.value, range(8)))
+    assert len(calls) == 1
+    assert all(value is values[0] for value in values)
+
+
+def test_bounded_map_close():
+    calls = list()
+
+    def func(item):
+        calls.append(item)
+        time.sleep(0.01)
+        return item
+
+    results = bounded_map(func, range(100), 2, window=10)
+    assert next(results) == 0
+    results.close()
+    time.sleep(0.05)
+    # The items that were queued but not started are cancelled.
+    assert len(calls) < 10
+
+
+def test_bounded_map_exceptions():
+    def func(item):
+        return 1 // item
+
+    results = list(bounded_map(func, [1, 0, 2], 2, return_exceptions=True))
+    assert [item for item, _ in results] == [1, 0, 2]
+    assert results[0][1] == 1
+    assert isinstance(results[1][1], ZeroDivisionError)
+    with pytest.raises(ZeroDivisionError):
+        list(bounded_map(func, [1, 0, 2], 2))
+
+
+def test_parse_date():
+    formats = ("%B %d %Y", "%B %Y", "%Y")
+    assert parse_date("April 05 1908", *formats) == date(1908, 4, 5)
+    assert parse_date("april  1908", *formats) == date(1908, 4, 1)
+    assert parse_date("1908", *formats) == date(1908, 1, 1)
+    assert parse_date("Sunday September 18 2016",
+                      "%A %B %d %Y") == date(2016, 9, 18)
+    assert parse_date("17/06/2016", "%d/%m/%Y") == date(2016, 6, 17)
+    assert parse_date("5 Jun 2018", "%d %B %Y") == date(2018, 6, 5)
+    for text in ("31/02/2016", "Smarch 2016", "2016-06-17"):
+        with pytest.raises(ValueError):
+            parse_date(text, "%d/%m/%Y", "%B %Y")
+
+
+def test_numbers():
+    assert int_or_none("12") == 12
+    assert int_or_none(" −12\xa0") == -12
+    assert int_or_none("-") is None
+    assert int_or_none(None) is None
+    assert float_or_none("1.85") == 1.85
+    assert float_or_none("n/a") is None
+    assert float_or_none(None) is None
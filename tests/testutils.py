@@ -1,4 +1,5 @@
 import os.path
+import requests
 
 
 DATA_ROOT = os.path.join(os.path.dirname(__file__), 'data')
@@ -8,3 +9,28 @@ def data_path(fname=None):
     if fname is not None:
         return os.path.join(DATA_ROOT, fname)
     return DATA_ROOT
+
+
+class FakeTransport:
+
+    """Transport serving local files instead of hitting the network."""
+
+    def __init__(self, routes):
+        # Maps URLs to file names in the data directory.
+        self.routes = routes
+        self.requested = list()
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        res = requests.Response()
+        res.url = url
+        res.encoding = "utf-8"
+        if url in self.routes:
+            res.status_code = 200
+            with open(data_path(self.routes[url]), "rb") as f:
+                res._content = f.read()
+        else:
+            res.status_code = 404
+            res._content = b""
+        res._content_consumed = True
+        return res